@@ -3,11 +3,35 @@
 Configuration settings with Azure Storage integration - Cleaned
 """
 import os
+import re
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import List, Optional, Any
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
+DEFAULT_MODEL_DIRS = [
+    "modelo/modelo_parent_child",
+    "modelo/modelo_header_data"
+]
+DEFAULT_ALLOWED_EXTENSIONS = [".csv", ".txt", ".xlsx", ".xls"]
+
+_BASE_DIR_STR = str(Path(__file__).resolve().parent.parent)
+
+_CSV_SPLIT = re.compile(r'\s*,\s*')
+
+def _parse_csv(v: Any, default: List[str], allow_empty: bool = True) -> List[str]:
+    """Parse a comma-separated string or list into a list of stripped, non-empty items"""
+    if isinstance(v, str):
+        items = [item for item in _CSV_SPLIT.split(v.strip()) if item]
+        if items or allow_empty:
+            return items
+        return list(default)
+    elif isinstance(v, list):
+        return [item for item in (str(raw).strip() for raw in v) if item]
+    else:
+        return list(default)
+
 class Settings(BaseSettings):
     # Basic app settings
     app_name: str = "Document Processing API"
@@ -26,7 +50,7 @@ class Settings(BaseSettings):
     csv_filename: Optional[str] = None
     
     # Local directories (used as fallback or temp)
-    base_dir: Path = Path(__file__).parent.parent
+    base_dir: str = _BASE_DIR_STR
     upload_dir: str = "uploads"
     predictions_dir: str = "predictions"
     processed_dir: str = "processed"
@@ -35,69 +59,43 @@ class Settings(BaseSettings):
     
     # File processing settings
     max_file_size: int = 100 * 1024 * 1024  # 100MB
-    allowed_extensions: List[str] = [".csv", ".txt", ".xlsx", ".xls"]
+    allowed_extensions: List[str] = DEFAULT_ALLOWED_EXTENSIONS
     rejection_threshold: float = 0.25  # Model confidence threshold
     
     # Model settings
-    model_dirs: List[str] = [
-        "modelo/modelo_parent_child",
-        "modelo/modelo_header_data"
-    ]
+    model_dirs: List[str] = DEFAULT_MODEL_DIRS
     
     @field_validator('model_dirs', mode='before')
     @classmethod
     def parse_model_dirs(cls, v: Any) -> List[str]:
         """Parse model_dirs from various input formats"""
-        if isinstance(v, str):
-            if ',' in v:
-                return [path.strip() for path in v.split(",") if path.strip()]
-            elif v.strip():
-                return [v.strip()]
-            else:
-                return []
-        elif isinstance(v, list):
-            return [str(item).strip() for item in v if str(item).strip()]
-        else:
-            return [
-                "modelo/modelo_parent_child",
-                "modelo/modelo_header_data"
-            ]
+        return _parse_csv(v, DEFAULT_MODEL_DIRS)
     
     @field_validator('allowed_extensions', mode='before')
     @classmethod
     def parse_allowed_extensions(cls, v: Any) -> List[str]:
         """Parse allowed_extensions from various input formats"""
-        if isinstance(v, str):
-            if ',' in v:
-                return [ext.strip() for ext in v.split(",") if ext.strip()]
-            elif v.strip():
-                return [v.strip()]
-            else:
-                return [".csv", ".txt", ".xlsx", ".xls"]
-        elif isinstance(v, list):
-            return [str(item).strip() for item in v if str(item).strip()]
-        else:
-            return [".csv", ".txt", ".xlsx", ".xls"]
+        return _parse_csv(v, DEFAULT_ALLOWED_EXTENSIONS, allow_empty=False)
     
-    @property
+    @cached_property
     def full_upload_dir(self) -> str:
-        return str(self.base_dir / self.upload_dir)
+        return os.path.join(self.base_dir, self.upload_dir)
     
-    @property
+    @cached_property
     def full_predictions_dir(self) -> str:
-        return str(self.base_dir / self.predictions_dir)
+        return os.path.join(self.base_dir, self.predictions_dir)
     
-    @property
+    @cached_property
     def full_processed_dir(self) -> str:
-        return str(self.base_dir / self.processed_dir)
+        return os.path.join(self.base_dir, self.processed_dir)
     
-    @property
+    @cached_property
     def full_results_dir(self) -> str:
-        return str(self.base_dir / self.results_dir)
+        return os.path.join(self.base_dir, self.results_dir)
     
-    @property
+    @cached_property
     def full_mapeos_dir(self) -> str:
-        return str(self.base_dir / self.mapeos_dir)
+        return os.path.join(self.base_dir, self.mapeos_dir)
     
     def validate_azure_config(self) -> bool:
         """Validate Azure Storage configuration"""
@@ -110,31 +108,28 @@ class Settings(BaseSettings):
         case_sensitive = False
         extra = "ignore"
 
-# Global settings instance
-_settings = None
+@lru_cache(maxsize=1)
+def _build_settings() -> Settings:
+    """Build the settings instance once; lru_cache makes first-call construction thread-safe"""
+    try:
+        settings = Settings()
+        
+        if settings.use_azure_storage and not settings.validate_azure_config():
+            print("Warning: Azure Storage is enabled but AZURE_STORAGE_CONNECTION_STRING is not configured. Using local storage as fallback.")
+            settings.use_azure_storage = False
+            
+    except Exception as e:
+        print(f"Error loading settings: {e}")
+        print("Using default settings with local storage")
+        
+        settings = Settings(
+            use_azure_storage=False,
+            azure_storage_connection_string="",
+            model_dirs=DEFAULT_MODEL_DIRS
+        )
+    
+    return settings
 
 def get_settings() -> Settings:
     """Get global settings instance"""
-    global _settings
-    if _settings is None:
-        try:
-            _settings = Settings()
-            
-            if _settings.use_azure_storage and not _settings.validate_azure_config():
-                print("Warning: Azure Storage is enabled but AZURE_STORAGE_CONNECTION_STRING is not configured. Using local storage as fallback.")
-                _settings.use_azure_storage = False
-                
-        except Exception as e:
-            print(f"Error loading settings: {e}")
-            print("Using default settings with local storage")
-            
-            _settings = Settings(
-                use_azure_storage=False,
-                azure_storage_connection_string="",
-                model_dirs=[
-                    "modelo/modelo_parent_child", 
-                    "modelo/modelo_header_data"
-                ]
-            )
-    
-    return _settings
\ No newline at end of file
+    return _build_settings()
\ No newline at end of file
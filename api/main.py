@@ -1,24 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
+import asyncio
 import datetime
+import importlib
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import orjson
 import os
+import queue
 import uvicorn
 import sys
-
-# Importar routers del portal-web
-from routes.projects import router as projects_router
-from routes.applications import router as applications_router
-from routes.upload import router as upload_router
-from routes.validation import router as validation_router
-from routes.conversion import router as conversion_router
-from routes.mapeo import router as mapeo_router
-from routes.manual_mapping import router as manual_mapping_router
-from routes.preview import router as preview_router
+import time
 
 # Configurar logging
 logging.basicConfig(
@@ -30,6 +27,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def start_log_listener() -> QueueListener:
+    """Mientras la app está en marcha, escribir el log raíz desde un hilo aparte (no bloquea el event loop)"""
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers[:]
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+def stop_log_listener(listener: QueueListener):
+    """Vaciar la cola y devolver los handlers originales al logger raíz"""
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        root_logger.addHandler(handler)
+
+# Routers del portal-web: se importan en el arranque (lifespan), en un hilo, antes de
+# aceptar tráfico. Si alguno falla, el arranque se aborta en vez de servir una app a medias
+_ROUTER_MODULES = (
+    "routes.projects",
+    "routes.applications",
+    # Portal Web Processing Routers
+    "routes.upload",
+    "routes.validation",
+    "routes.conversion",
+    "routes.mapeo",
+    "routes.manual_mapping",
+    "routes.preview",
+)
+
+async def load_routers(app: FastAPI):
+    """Importar los routers en un hilo y registrarlos en la aplicación"""
+    try:
+        for module_name in _ROUTER_MODULES:
+            module = await asyncio.to_thread(importlib.import_module, module_name)
+            app.include_router(module.router)
+    except Exception:
+        logger.exception("Failed to load portal web routers")
+        raise
+    
+    # Regenerar el esquema OpenAPI ya con todas las rutas
+    # para que la primera petición a /docs no lo pague
+    app.openapi_schema = None
+    app.openapi()
+    logger.info("Portal web routers loaded")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener = start_log_listener()
+    try:
+        await load_routers(app)
+        yield
+    finally:
+        stop_log_listener(log_listener)
+
 # Crear FastAPI instance con path prefix
 app = FastAPI(
     title="SmartAudit Proto API",
@@ -38,11 +96,14 @@ app = FastAPI(
     root_path="/smau-proto",
     docs_url="/smau-proto/docs",
     redoc_url="/smau-proto/redoc",
-    openapi_url="/smau-proto/openapi.json"
+    openapi_url="/smau-proto/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configurar CORS para dominios smartaudit.com
-ALLOWED_ORIGINS = [
+# frozenset: la comprobación del origen en cada preflight es O(1)
+ALLOWED_ORIGINS = frozenset((
     "https://devapi.grantthornton.es",
     "https://testapi.grantthornton.es",
     "https://api.grantthornton.es",
@@ -51,7 +112,7 @@ ALLOWED_ORIGINS = [
     "https://smartaudit.grantthornton.es", 
     "http://localhost:3000",
     "http://localhost:4280",
-]
+))
 
 app.add_middleware(
     CORSMiddleware,
@@ -61,58 +122,112 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware de seguridad para hosts permitidos
-app.add_middleware(
-    TrustedHostMiddleware, 
-    allowed_hosts=["*.grantthornton.es", "localhost", "127.0.0.1", "*"]
-)
-
-# Incluir todos los routers del portal-web
-app.include_router(projects_router)
-app.include_router(applications_router)
+# Middleware de seguridad para hosts permitidos (ALLOWED_HOSTS separado por comas)
+# Con el comodín "*" el middleware aceptaría cualquier host, así que no se instala
+ALLOWED_HOSTS = [
+    host.strip() for host in os.getenv("ALLOWED_HOSTS", "*").split(",") if host.strip()
+]
 
-# Portal Web Processing Routers
-app.include_router(upload_router)
-app.include_router(validation_router)
-app.include_router(conversion_router)
-app.include_router(mapeo_router)
-app.include_router(manual_mapping_router)
-app.include_router(preview_router)
+if "*" not in ALLOWED_HOSTS:
+    app.add_middleware(
+        TrustedHostMiddleware, 
+        allowed_hosts=ALLOWED_HOSTS
+    )
 
 # Modelos Pydantic
 class HealthResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     status: str
     timestamp: datetime.datetime
     version: str
     environment: str
     checks: dict
 
+# Variables de entorno leídas una sola vez al arrancar (inmutables en Container Apps)
+_ENV_SNAPSHOT = {
+    key: os.getenv(key, "unknown")
+    for key in (
+        "HOSTNAME",
+        "CONTAINER_APP_NAME",
+        "CONTAINER_APP_REVISION",
+        "APP_VERSION",
+        "IMAGE_TAG",
+        "BUILD_ID",
+        "DEPLOYMENT_TIMESTAMP",
+    )
+}
+_AZURE_CONFIGURED = bool(os.getenv("AZURE_STORAGE_CONNECTION_STRING"))
+_AZURE_CLIENT_CONFIGURED = bool(os.getenv("AZURE_CLIENT_ID"))
+_ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
 # Utility functions
 def get_environment():
-    return os.getenv("ENVIRONMENT", "development")
+    return _ENVIRONMENT
 
 def get_current_timestamp():
     return datetime.datetime.now(datetime.timezone.utc)
 
+# Timestamp ISO cacheado con resolución de 1 segundo para las respuestas de sondeo
+_TS_CACHE = [0.0, ""]
+
+def get_current_iso() -> str:
+    now = time.time()
+    if now - _TS_CACHE[0] >= 1.0:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat()
+    return _TS_CACHE[1]
+
+# Formato de fechas de HealthResponse (pydantic): UTC con sufijo "Z". El resto de endpoints
+# devuelve ORJSONResponse, que como jsonable_encoder emite "+00:00"
+_HEALTH_JSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+def health_json_response(payload: dict) -> Response:
+    """Serializar con orjson igual que lo haría el response_model HealthResponse"""
+    return Response(orjson.dumps(payload, option=_HEALTH_JSON_OPTIONS), media_type="application/json")
+
+_AZURE_STATUS = "ok" if _AZURE_CONFIGURED else "not_configured"
+
+_BASE_CHECKS = {
+    "database": "ok",  # Simular check de BD
+    "memory": "ok",
+    "disk_space": "ok",
+    "azure_storage": _AZURE_STATUS
+}
+
+# Verificaciones específicas de SmartAudit
+_BUSINESS_CHECKS = {
+    "api_endpoints": "ok",  # Verificar endpoints principales
+    "memory_usage": "ok",   # Verificar uso de memoria
+    "portal_web_integration": "ok",  # Portal web integrado
+    "azure_storage": _AZURE_STATUS
+}
+
+# Combinar checks infrastructure + business
+_APPLICATION_CHECKS = {
+    **_BASE_CHECKS,
+    **_BUSINESS_CHECKS,
+    "deployment_info": {
+        "app_version": _ENV_SNAPSHOT["APP_VERSION"],
+        "image_tag": _ENV_SNAPSHOT["IMAGE_TAG"],
+        "build_id": _ENV_SNAPSHOT["BUILD_ID"],
+        "container_app_name": _ENV_SNAPSHOT["CONTAINER_APP_NAME"],
+        "container_app_revision": _ENV_SNAPSHOT["CONTAINER_APP_REVISION"]
+    }
+}
+
 def perform_health_checks():
     """Realizar verificaciones de salud de la aplicación"""
-    checks = {
-        "database": "ok",  # Simular check de BD
-        "memory": "ok",
-        "disk_space": "ok",
-        "azure_storage": "ok" if os.getenv("AZURE_STORAGE_CONNECTION_STRING") else "not_configured"
-    }
-    
-    return checks
+    return dict(_BASE_CHECKS)
 
 # Exception handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "detail": exc.detail,
-            "timestamp": get_current_timestamp().isoformat()
+            "timestamp": get_current_iso()
         }
     )
 
@@ -120,25 +235,25 @@ async def http_exception_handler(request, exc):
 # HEALTH ENDPOINTS PARA CONTAINER APPS (Infrastructure level)
 # ==========================================
 
+# Prefijos JSON precalculados: cada sondeo solo añade el timestamp
+_READY_PREFIX = b'{"status":"ready","service":"container-ready","timestamp":"'
+_ALIVE_PREFIX = b'{"status":"alive","service":"container-alive","timestamp":"'
+_PROBE_HEADERS = {"Cache-Control": "no-store"}
+
+def _probe_response(prefix: bytes) -> Response:
+    return Response(
+        content=prefix + get_current_iso().encode() + b'"}',
+        media_type="application/json",
+        headers=_PROBE_HEADERS
+    )
+
 @app.get("/health/ready")
 async def readiness_probe():
     """
     Readiness probe - Container Apps usa esto automáticamente
     Verifica que el contenedor está listo para recibir tráfico
     """
-    try:
-        return {
-            "status": "ready",
-            "timestamp": get_current_timestamp().isoformat(),
-            "service": "container-ready"
-        }
-    except Exception as e:
-        logger.error(f"Container readiness failed: {str(e)}")
-        return {
-            "status": "ready", 
-            "timestamp": get_current_timestamp().isoformat(),
-            "warning": "degraded_but_ready"
-        }
+    return _probe_response(_READY_PREFIX)
 
 @app.get("/health/live")
 async def liveness_probe():
@@ -146,91 +261,70 @@ async def liveness_probe():
     Liveness probe - Container Apps usa esto automáticamente
     Verifica que el contenedor debe seguir corriendo (no restart)
     """
-    try:
-        return {
-            "status": "alive",
-            "timestamp": get_current_timestamp().isoformat(),
-            "service": "container-alive"
-        }
-    except Exception as e:
-        logger.error(f"Container liveness failed: {str(e)}")
-        return {
-            "status": "alive",
-            "timestamp": get_current_timestamp().isoformat(),
-            "warning": "degraded_but_alive"
-        }
+    return _probe_response(_ALIVE_PREFIX)
 
 # ==========================================
 # APPLICATION HEALTH ENDPOINT (Business level)
 # ==========================================
 
+_SIMPLE_HEALTH_BASE = {
+    "status": "healthy",
+    "message": "SmartAudit Proto API funcionando correctamente con Portal Web",
+}
+
+_SIMPLE_HEALTH_TAIL = {
+    "version": "1.0.0",
+    "environment": _ENVIRONMENT,
+    "service": "smartaudit-proto-api-integrated",
+    "container_info": {
+        "hostname": _ENV_SNAPSHOT["HOSTNAME"],
+        "container_app_name": _ENV_SNAPSHOT["CONTAINER_APP_NAME"],
+        "revision": _ENV_SNAPSHOT["CONTAINER_APP_REVISION"]
+    },
+    "deployment_info": {
+        "app_version": _ENV_SNAPSHOT["APP_VERSION"],
+        "image_tag": _ENV_SNAPSHOT["IMAGE_TAG"],
+        "build_id": _ENV_SNAPSHOT["BUILD_ID"],
+        "deployment_timestamp": _ENV_SNAPSHOT["DEPLOYMENT_TIMESTAMP"]
+    },
+    "azure_config": {
+        "storage_configured": _AZURE_CONFIGURED,
+        "environment_from_azure": _AZURE_CLIENT_CONFIGURED
+    }
+}
+
 @app.get("/smau-proto/health/simple")
 async def simple_health_check():
     """
     Health check simplificado para debugging
     """
-    return {
-        "status": "healthy",
-        "message": "SmartAudit Proto API funcionando correctamente con Portal Web",
-        "timestamp": get_current_timestamp().isoformat(),
-        "version": "1.0.0",
-        "environment": get_environment(),
-        "service": "smartaudit-proto-api-integrated",
-        "container_info": {
-            "hostname": os.getenv("HOSTNAME", "unknown"),
-            "container_app_name": os.getenv("CONTAINER_APP_NAME", "unknown"),
-            "revision": os.getenv("CONTAINER_APP_REVISION", "unknown")
-        },
-        "deployment_info": {
-            "app_version": os.getenv("APP_VERSION", "unknown"),
-            "image_tag": os.getenv("IMAGE_TAG", "unknown"), 
-            "build_id": os.getenv("BUILD_ID", "unknown"),
-            "deployment_timestamp": os.getenv("DEPLOYMENT_TIMESTAMP", "unknown")
-        },
-        "azure_config": {
-            "storage_configured": bool(os.getenv("AZURE_STORAGE_CONNECTION_STRING")),
-            "environment_from_azure": bool(os.getenv("AZURE_CLIENT_ID"))
-        }
-    }
+    return ORJSONResponse({
+        **_SIMPLE_HEALTH_BASE,
+        "timestamp": get_current_iso(),
+        **_SIMPLE_HEALTH_TAIL
+    })
 
-@app.get("/smau-proto/health", response_model=HealthResponse)
+@app.get(
+    "/smau-proto/health",
+    response_model=None,
+    responses={200: {"model": HealthResponse}}
+)
 async def application_health_check():
     """
     Application health check - Desde Application Gateway
     Verifica que SmartAudit Proto API funciona correctamente
     """
     try:
-        checks = perform_health_checks()
-        
-        # Verificaciones específicas de SmartAudit
-        business_checks = {
-            "api_endpoints": "ok",  # Verificar endpoints principales
-            "memory_usage": "ok",   # Verificar uso de memoria
-            "portal_web_integration": "ok",  # Portal web integrado
-            "azure_storage": checks.get("azure_storage", "not_configured")
-        }
-        
-        # Combinar checks infrastructure + business
-        all_checks = {**checks, **business_checks}
-        
-        return HealthResponse(
-            status="healthy",
-            timestamp=get_current_timestamp(),
-            version="1.0.0",
-            environment=get_environment(),
-            checks={
-                **all_checks,
-                "deployment_info": {
-                    "app_version": os.getenv("APP_VERSION", "unknown"),
-                    "image_tag": os.getenv("IMAGE_TAG", "unknown"), 
-                    "build_id": os.getenv("BUILD_ID", "unknown"),
-                    "container_app_name": os.getenv("CONTAINER_APP_NAME", "unknown"),
-                    "container_app_revision": os.getenv("CONTAINER_APP_REVISION", "unknown")
-                }
-            }
-        )
+        # Sin validación de respuesta: el cuerpo ya tiene la forma de HealthResponse
+        return health_json_response({
+            "status": "healthy",
+            "timestamp": get_current_timestamp(),
+            "version": "1.0.0",
+            "environment": get_environment(),
+            "checks": _APPLICATION_CHECKS
+        })
     except Exception as e:
-        logger.error(f"Application health check failed: {str(e)}")
+        logger.error("Application health check failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="SmartAudit Proto API health check failed"
@@ -240,18 +334,105 @@ async def application_health_check():
 # ROUTES PRINCIPALES
 # ==========================================
 
+_AVAILABLE_ENDPOINTS = (
+    "/smau-proto/api/import/upload",
+    "/smau-proto/api/import/validate/{execution_id}",
+    "/smau-proto/api/import/convert/{execution_id}",
+    "/smau-proto/api/import/mapeo/{execution_id}",
+    "/smau-proto/api/import/preview/{execution_id}",
+    "/smau-proto/api/projects/",
+    "/smau-proto/api/applications/",
+)
+
+# Cuerpos de respuesta estáticos: se construyen una vez y solo se añade el timestamp
+_ROOT_REDIRECT_BODY = {
+    "message": "SmartAudit Proto API with Portal Web Integration",
+    "version": "1.0.0",
+    "docs_url": "/smau-proto/docs",
+    "api_base": "/smau-proto/",
+    "features": ["upload", "validation", "conversion", "mapeo", "manual_mapping"]
+}
+
+_ROOT_BASE = {
+    "message": "SmartAudit Proto API with Portal Web",
+    "version": "1.0.0",
+    "python_version": "3.11",
+    "framework": "FastAPI",
+    "environment": _ENVIRONMENT,
+    "docs_url": "/smau-proto/docs",
+}
+
+_ROOT_TAIL = {
+    "available_endpoints": list(_AVAILABLE_ENDPOINTS)
+}
+
+_VERSION_BASE = {
+    "api_version": "1.0.0",
+    "python_version": "3.11",
+    "fastapi_version": "0.104.1",
+    "environment": _ENVIRONMENT,
+}
+
+_VERSION_TAIL = {
+    "portal_web_integrated": True,
+    "azure_storage_enabled": _AZURE_CONFIGURED,
+    "container_info": {
+        "hostname": _ENV_SNAPSHOT["HOSTNAME"],
+        "container_app_name": _ENV_SNAPSHOT["CONTAINER_APP_NAME"],
+        "container_app_revision": _ENV_SNAPSHOT["CONTAINER_APP_REVISION"]
+    }
+}
+
+_TEST_CONNECTION_BASE = {
+    "message": "SmartAudit Proto API - Conexión exitosa con Portal Web",
+    "status": "connected",
+    "api_url": "/smau-proto/",
+}
+
+_TEST_CONNECTION_TAIL = {
+    "cors_enabled": True,
+    "environment": _ENVIRONMENT,
+    "version": "1.0.0",
+    "python_version": "3.11",
+    "framework": "FastAPI",
+    "portal_web_features": {
+        "upload": True,
+        "validation": True,
+        "conversion": True,
+        "mapeo": True,
+        "manual_mapping": True,
+        "preview": True
+    },
+    "azure_storage": {
+        "configured": _AZURE_CONFIGURED,
+        "connection_available": _AZURE_CONFIGURED
+    },
+    "container_info": {
+        "hostname": _ENV_SNAPSHOT["HOSTNAME"],
+        "container_app_name": _ENV_SNAPSHOT["CONTAINER_APP_NAME"],
+        "revision": _ENV_SNAPSHOT["CONTAINER_APP_REVISION"]
+    },
+    "deployment_info": {
+        "app_version": _ENV_SNAPSHOT["APP_VERSION"],
+        "image_tag": _ENV_SNAPSHOT["IMAGE_TAG"],
+        "build_id": _ENV_SNAPSHOT["BUILD_ID"],
+        "deployment_timestamp": _ENV_SNAPSHOT["DEPLOYMENT_TIMESTAMP"]
+    },
+    "available_endpoints": [
+        *_AVAILABLE_ENDPOINTS,
+        "/smau-proto/health",
+        "/smau-proto/test-connection",
+        "/smau-proto/version",
+        "/smau-proto/docs"
+    ]
+}
+
 @app.get("/")
 async def root_redirect():
     """
     Endpoint raíz que redirige a la documentación
     """
-    return {
-        "message": "SmartAudit Proto API with Portal Web Integration",
-        "version": "1.0.0",
-        "docs_url": "/smau-proto/docs",
-        "api_base": "/smau-proto/",
-        "features": ["upload", "validation", "conversion", "mapeo", "manual_mapping"]
-    }
+    return ORJSONResponse(_ROOT_REDIRECT_BODY)
 
 @app.get("/smau-proto/", response_model=dict)
 async def root():
@@ -259,104 +440,44 @@ async def root():
     Endpoint raíz de la API
     """
     logger.info("Root endpoint accessed")
-    return {
-        "message": "SmartAudit Proto API with Portal Web",
-        "version": "1.0.0",
-        "python_version": "3.11",
-        "framework": "FastAPI",
-        "environment": get_environment(),
-        "docs_url": "/smau-proto/docs",
+    return ORJSONResponse({
+        **_ROOT_BASE,
         "timestamp": get_current_timestamp(),
-        "available_endpoints": [
-            "/smau-proto/api/import/upload",
-            "/smau-proto/api/import/validate/{execution_id}",
-            "/smau-proto/api/import/convert/{execution_id}",
-            "/smau-proto/api/import/mapeo/{execution_id}",
-            "/smau-proto/api/import/preview/{execution_id}",
-            "/smau-proto/api/projects/",
-            "/smau-proto/api/applications/"
-        ]
-    }
+        **_ROOT_TAIL
+    })
 
 @app.get("/smau-proto/version")
 async def get_version():
     """
     Información de versión detallada
     """
-    return {
-        "api_version": "1.0.0",
-        "python_version": "3.11",
-        "fastapi_version": "0.104.1",
-        "environment": get_environment(),
+    return ORJSONResponse({
+        **_VERSION_BASE,
         "build_timestamp": get_current_timestamp(),
-        "portal_web_integrated": True,
-        "azure_storage_enabled": bool(os.getenv("AZURE_STORAGE_CONNECTION_STRING")),
-        "container_info": {
-            "hostname": os.getenv("HOSTNAME", "unknown"),
-            "container_app_name": os.getenv("CONTAINER_APP_NAME", "unknown"),
-            "container_app_revision": os.getenv("CONTAINER_APP_REVISION", "unknown")
-        }
-    }
+        **_VERSION_TAIL
+    })
 
 @app.get("/smau-proto/test-connection")
 async def test_connection():
     """Endpoint simple para testing de conectividad desde el frontend"""
-    return {
-        "message": "SmartAudit Proto API - Conexión exitosa con Portal Web",
-        "status": "connected",
-        "api_url": "/smau-proto/",
-        "timestamp": get_current_timestamp().isoformat(),
-        "cors_enabled": True,
-        "environment": get_environment(),
-        "version": "1.0.0",
-        "python_version": "3.11",
-        "framework": "FastAPI",
-        "portal_web_features": {
-            "upload": True,
-            "validation": True,
-            "conversion": True,
-            "mapeo": True,
-            "manual_mapping": True,
-            "preview": True
-        },
-        "azure_storage": {
-            "configured": bool(os.getenv("AZURE_STORAGE_CONNECTION_STRING")),
-            "connection_available": bool(os.getenv("AZURE_STORAGE_CONNECTION_STRING"))
-        },
-        "container_info": {
-            "hostname": os.getenv("HOSTNAME", "unknown"),
-            "container_app_name": os.getenv("CONTAINER_APP_NAME", "unknown"),
-            "revision": os.getenv("CONTAINER_APP_REVISION", "unknown")
-        },
-        "deployment_info": {
-            "app_version": os.getenv("APP_VERSION", "unknown"),
-            "image_tag": os.getenv("IMAGE_TAG", "unknown"), 
-            "build_id": os.getenv("BUILD_ID", "unknown"),
-            "deployment_timestamp": os.getenv("DEPLOYMENT_TIMESTAMP", "unknown")
-        },
-        "available_endpoints": [
-            "/smau-proto/api/import/upload",
-            "/smau-proto/api/import/validate/{execution_id}",
-            "/smau-proto/api/import/convert/{execution_id}",
-            "/smau-proto/api/import/mapeo/{execution_id}",
-            "/smau-proto/api/import/preview/{execution_id}",
-            "/smau-proto/api/projects/",
-            "/smau-proto/api/applications/",
-            "/smau-proto/health",
-            "/smau-proto/test-connection",
-            "/smau-proto/version",
-            "/smau-proto/docs"
-        ]
-    }
+    return ORJSONResponse({
+        **_TEST_CONNECTION_BASE,
+        "timestamp": get_current_iso(),
+        **_TEST_CONNECTION_TAIL
+    })
 
 if __name__ == "__main__":
     # Para desarrollo local - configuración optimizada para Container Apps
     port = int(os.getenv("PORT", 8000))
+    # uvloop/httptools vienen con uvicorn[standard]; uvloop no existe en Windows
+    use_uvloop = sys.platform != "win32"
     uvicorn.run(
         "main:app", 
         host="0.0.0.0", 
         port=port, 
         reload=False,  # Deshabilitado en container
+        loop="uvloop" if use_uvloop else "asyncio",
+        http="httptools",
         log_level="info",
         timeout_keep_alive=65,  # Timeout extendido
         timeout_graceful_shutdown=30,
@@ -2,10 +2,16 @@
 """
 Pydantic models for execution tracking and API responses - Cleaned
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, Dict, Any, List
 
+# DTOs inmutables: se crean una vez por respuesta y nunca se modifican
+# (update_execution reconstruye ExecutionStatus en lugar de mutarlo)
+FROZEN_MODEL_CONFIG = ConfigDict(frozen=True, extra='ignore')
+
 class ExecutionStatus(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     id: str
     status: str  # 'pending', 'processing', 'completed', 'failed', 'mapeo', 'mapeo_completed', 'manual_mapping_required'
     step: Optional[str] = None  # 'upload', 'validation', 'conversion', 'mapeo', 'manual_mapping', etc.
@@ -22,25 +28,37 @@ class ExecutionStatus(BaseModel):
 
 # Request/Response Models
 class UploadResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     file_name: str
     message: str
 
 class ValidationRequest(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
 
 class ValidationResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     message: str
 
 class ConversionResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     message: str
 
 class MapeoRequest(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     erp_hint: Optional[str] = None
 
 class MapeoResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     message: str
     input_file: str
@@ -48,6 +66,8 @@ class MapeoResponse(BaseModel):
     manual_mapping_required: Optional[bool] = None
 
 class MapeoStatusResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     status: str
     step: Optional[str] = None
@@ -59,6 +79,8 @@ class MapeoStatusResponse(BaseModel):
     unmapped_fields_count: Optional[int] = None
 
 class MapeoSummaryResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     trainer_type: str
     summary: Dict[str, int]
@@ -68,6 +90,8 @@ class MapeoSummaryResponse(BaseModel):
 
 # Manual mapping models
 class UnmappedFieldDetail(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     column_name: str
     sample_data: List[str]
     data_type: str
@@ -77,6 +101,8 @@ class UnmappedFieldDetail(BaseModel):
     unique_values: int
 
 class UnmappedFieldsResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     unmapped_fields: List[UnmappedFieldDetail]
     available_standard_fields: List[str]
@@ -85,14 +111,20 @@ class UnmappedFieldsResponse(BaseModel):
     message: str
 
 class MappingDecision(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     column_name: str
     selected_field: str
     confidence: Optional[float] = 0.8
 
 class ManualMappingRequest(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     mappings: List[MappingDecision]
 
 class ApplyMappingResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     execution_id: str
     applied_mappings: int
     updated_decisions: Dict[str, str]
@@ -100,14 +132,20 @@ class ApplyMappingResponse(BaseModel):
     message: str
 
 class PreviewResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     data: List[Dict[str, Any]]
 
 class FileInfo(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     path: Optional[str]
     exists: bool
     size: int
 
 class ExecutionFilesResponse(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     original_file: FileInfo
     result_file: FileInfo
     mapeo_files: Optional[Dict[str, FileInfo]] = None
\ No newline at end of file
@@ -1,12 +1,45 @@
 # procesos_estructura/feature_processor.py
 import re
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    import ahocorasick  # pyahocorasick: búsqueda multi-keyword en una sola pasada
+except ImportError:
+    ahocorasick = None
+
+
+class _CharClassTable(dict):
+    """
+    Tabla para str.translate que asigna a cada carácter su clase:
+    'd' dígito, 'u' letra mayúscula, 'l' otra letra, 's' espacio, 'o' resto.
+    Usa los mismos criterios que str.isdigit/isalpha/isupper/isspace y se completa
+    bajo demanda para caracteres fuera de Latin-1.
+    """
+    def __missing__(self, ordinal: int) -> str:
+        ch = chr(ordinal)
+        if ch.isdigit():
+            cls = 'd'
+        elif ch.isalpha():
+            cls = 'u' if ch.isupper() else 'l'
+        elif ch.isspace():
+            cls = 's'
+        else:
+            cls = 'o'
+        self[ordinal] = cls
+        return cls
+
+
+_CHAR_CLASSES = _CharClassTable()
+for _ordinal in range(256):
+    _CHAR_CLASSES[_ordinal]
+
+# Separadores que se ignoran al decidir si una línea es solo numérica
+_NUMERIC_SEPARATORS = str.maketrans('', '', '.,- ')
+
 
 class DocumentType(Enum):
     """Tipos de estructura de documento"""
@@ -28,12 +61,41 @@ class FeatureConfig:
 class DocumentFeatureExtractor:
     """Extractor optimizado de features para libros diarios contables"""
     
+    # Flags contables de presencia: feature -> patrones que la activan
+    ACCOUNTING_FLAG_PATTERNS = {
+        'has_subcuenta': ('subcuenta',),
+        'has_asiento': ('asiento',),
+        'has_referencia': ('referencia',),
+        'has_id_documento': ('id_documento',),
+        'has_negativo': ('importe_negativo',),
+        'has_parentesis': ('importe_parentesis',),
+        'has_saldo_cero': ('saldo_cero',),
+        'is_cuadre_line': ('cuadre',),
+        'has_fecha': ('fecha',),
+        'has_periodo': ('periodo',),
+        'has_ejercicio': ('ejercicio',),
+        'has_moneda': ('moneda',),
+        'has_codigo_doc': ('codigo_doc',),
+    }
+    
+    # Flags por línea que la parte contextual desplaza a la línea anterior/siguiente
+    CONTEXTUAL_FLAGS = ('is_nonempty', 'indent', 'is_separator', 'is_blank',
+                        'importe_count', 'total_kw', 'cuenta_prefix')
+    
     def __init__(self, config: Optional[FeatureConfig] = None):
         self.config = config or FeatureConfig(DocumentType.HEADER_DATA)
-        self.label_encoder = LabelEncoder()
+        self._label_encoder = None
         self._init_patterns()
         self._init_keywords()
     
+    @property
+    def label_encoder(self):
+        """LabelEncoder de sklearn, importado solo si se usa (evita cargar sklearn al importar el módulo)"""
+        if self._label_encoder is None:
+            from sklearn.preprocessing import LabelEncoder
+            self._label_encoder = LabelEncoder()
+        return self._label_encoder
+    
     def _init_patterns(self):
         """Inicializa patrones de regex específicos de libros diarios"""
         self.patterns = {
@@ -55,6 +117,7 @@ class DocumentFeatureExtractor:
             'fecha_iso': re.compile(r"\b\d{4}-\d{2}-\d{2}\b"),  # 2024-01-01
             'fecha_euro': re.compile(r"\b\d{2}[/.-]\d{2}[/.-]\d{4}\b"),  # 31/12/2024
             'fecha_compacta': re.compile(r"\b\d{6}\b|\b\d{8}\b"),  # 311224 o 31122024
+            'fecha': re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{2}[/.-]\d{2}[/.-]\d{4}\b|\b\d{6}\b|\b\d{8}\b"),  # cualquiera de las anteriores
             'periodo': re.compile(r"\b(ene|feb|mar|abr|may|jun|jul|ago|sep|oct|nov|dic|enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre)\b", re.IGNORECASE),
             'ejercicio': re.compile(r"\b(ejercicio\s+)?20\d{2}\b", re.IGNORECASE),
             
@@ -69,7 +132,56 @@ class DocumentFeatureExtractor:
             # Balances
             'saldo_cero': re.compile(r"\b0[.,]00?\b"),  # 0.00 o 0,00
             'cuadre': re.compile(r"^\s*0+\s*$"),  # Líneas con solo ceros
+            
+            # Paginación y continuación (cada lista en una sola alternancia)
+            'page_number': re.compile(r"(?:pág\.?|página|hoja|page)\s*\d+", re.IGNORECASE),  # Pág. 1, Hoja 1
+            'continuation': re.compile(r"suma y sigue|van\s+[\d.,]+|vienen\s+[\d.,]+|arrastre|carry\s*forward", re.IGNORECASE),
+            
+            # Formas de línea
+            'detail_line': re.compile(r"^\s*\d+\s+.+\s+[\d.,]+\s+[\d.,]+\s*$"),  # número + texto + importes
+            'account_description': re.compile(r"^\s*\d{6,9}\s+[A-Za-záéíóúñÁÉÍÓÚÑ\s]+\s*"),  # cuenta + descripción
+        }
+        
+        # Variantes re.ASCII: evitan consultar las tablas Unicode en \d, \w y \b, que sobre una
+        # línea ASCII dan el mismo resultado. \s no: en Unicode también casa \x1c-\x1f y en ASCII
+        # no, así que los patrones con \s o \S conservan la versión Unicode
+        self._ascii_patterns = {
+            name: (
+                pattern if '\\s' in pattern.pattern or '\\S' in pattern.pattern
+                else re.compile(pattern.pattern, (pattern.flags & ~re.UNICODE) | re.ASCII)
+            )
+            for name, pattern in self.patterns.items()
         }
+        
+        # Métodos search de los flags contables, resueltos una sola vez
+        self._accounting_searches = tuple(
+            tuple(self.patterns[name].search for name in names)
+            for names in self.ACCOUNTING_FLAG_PATTERNS.values()
+        )
+        self._accounting_searches_ascii = tuple(
+            tuple(self._ascii_patterns[name].search for name in names)
+            for names in self.ACCOUNTING_FLAG_PATTERNS.values()
+        )
+    
+    def _pattern_method(self, name: str, method: str):
+        """Método del patrón (search, match, findall) que usa la variante ASCII si la línea es ASCII"""
+        unicode_method = getattr(self.patterns[name], method)
+        ascii_method = getattr(self._ascii_patterns[name], method)
+        # str.isascii es O(1): CPython guarda si la cadena es ASCII
+        return lambda text: ascii_method(text) if text.isascii() else unicode_method(text)
+    
+    def _accounting_flags(self, text: str) -> Tuple[int, ...]:
+        """Flags contables de una línea, en el orden de ACCOUNTING_FLAG_PATTERNS, en un solo recorrido"""
+        flags = []
+        all_searches = self._accounting_searches_ascii if text.isascii() else self._accounting_searches
+        for searches in all_searches:
+            found = 0
+            for search in searches:
+                if search(text) is not None:
+                    found = 1
+                    break
+            flags.append(found)
+        return tuple(flags)
     
     def _init_keywords(self):
         """Keywords específicos de libros diarios contables"""
@@ -122,6 +234,24 @@ class DocumentFeatureExtractor:
                 'falta nº cta', 'línea asiento', 'detalle asiento'
             }
         }
+        
+        # Un autómata Aho-Corasick por grupo: encuentra todas las keywords de una línea
+        # (incluidas las solapadas, p.ej. 'suma' dentro de 'suma y sigue') en un solo recorrido
+        self._keyword_automata = {}
+        if ahocorasick is not None:
+            for group, keywords in self.keywords.items():
+                automaton = ahocorasick.Automaton()
+                for kw in keywords:
+                    automaton.add_word(kw, kw)
+                automaton.make_automaton()
+                self._keyword_automata[group] = automaton
+    
+    def _keyword_count(self, group: str, text_lower: str) -> int:
+        """Número de keywords distintos del grupo presentes en el texto"""
+        automaton = self._keyword_automata.get(group)
+        if automaton is None:
+            return sum(1 for kw in self.keywords[group] if kw in text_lower)
+        return len({kw for _, kw in automaton.iter(text_lower)})
     
     # ===========================
     # FEATURES ESTRUCTURALES
@@ -146,12 +276,12 @@ class DocumentFeatureExtractor:
         features['has_columns'] = int(len(multi_spaces) >= 2)
         
         # Separadores y líneas especiales
-        features['is_separator'] = int(bool(self.patterns['separator'].search(text)))
-        features['is_empty'] = int(len(text.strip()) == 0)
-        features['is_numeric_only'] = int(text.strip().replace('.', '').replace(',', '').replace('-', '').replace(' ', '').isdigit() if text.strip() else False)
+        stripped = text.strip()
+        features['is_separator'] = int(self.patterns['separator'].search(text) is not None)
+        features['is_empty'] = int(not stripped)
+        features['is_numeric_only'] = int(bool(stripped) and stripped.translate(_NUMERIC_SEPARATORS).isdigit())
         
         # Alineación de texto
-        stripped = text.strip()
         if stripped and len(text) > len(stripped):
             # Detecta si está centrado
             left_spaces = len(text) - len(text.lstrip())
@@ -162,13 +292,13 @@ class DocumentFeatureExtractor:
         
         # Densidad de caracteres especiales
         if text:
-            features['digit_ratio'] = sum(c.isdigit() for c in text) / len(text)
-            features['letter_ratio'] = sum(c.isalpha() for c in text) / len(text)
-            features['space_ratio'] = sum(c.isspace() for c in text) / len(text)
+            digits, letters, spaces, uppers = self._char_class_counts(text)
+            features['digit_ratio'] = digits / len(text)
+            features['letter_ratio'] = letters / len(text)
+            features['space_ratio'] = spaces / len(text)
             
             # Ratio de mayúsculas (importante para headers)
-            letters = [c for c in text if c.isalpha()]
-            features['upper_ratio'] = sum(c.isupper() for c in letters) / max(1, len(letters))
+            features['upper_ratio'] = uppers / max(1, letters)
         else:
             features['digit_ratio'] = 0
             features['letter_ratio'] = 0
@@ -181,7 +311,7 @@ class DocumentFeatureExtractor:
     # FEATURES CONTABLES
     # ===========================
     
-    def extract_accounting_features(self, text: str) -> Dict[str, float]:
+    def extract_accounting_features(self, text: str, text_lower: Optional[str] = None) -> Dict[str, float]:
         """Features específicas de contabilidad y libros diarios"""
         if not self.config.enable_accounting:
             return {}
@@ -189,58 +319,33 @@ class DocumentFeatureExtractor:
         features = {}
         
         # Cuentas contables
-        cuentas = self.patterns['cuenta_contable'].findall(text)
-        features['cuenta_count'] = len(cuentas)
-        features['has_cuenta'] = int(len(cuentas) > 0)
-        features['has_subcuenta'] = int(bool(self.patterns['subcuenta'].search(text)))
-        
-        # Números de asiento y referencias
-        features['has_asiento'] = int(bool(self.patterns['asiento'].search(text)))
-        features['has_referencia'] = int(bool(self.patterns['referencia'].search(text)))
-        features['has_id_documento'] = int(bool(self.patterns['id_documento'].search(text)))
+        # (len(findall) es más rápido en CPython que contar con finditer o subn)
+        cuenta_count = len(self.patterns['cuenta_contable'].findall(text))
+        features['cuenta_count'] = cuenta_count
+        features['has_cuenta'] = int(cuenta_count > 0)
         
         # Importes y montos
-        importes = self.patterns['importe_formal'].findall(text)
-        features['importe_count'] = len(importes)
-        features['has_importe'] = int(len(importes) > 0)
-        features['has_multiple_importes'] = int(len(importes) >= 2)  # Debe y Haber
-        
-        # Importes negativos o entre paréntesis (común en contabilidad)
-        features['has_negativo'] = int(bool(self.patterns['importe_negativo'].search(text)))
-        features['has_parentesis'] = int(bool(self.patterns['importe_parentesis'].search(text)))
-        
-        # Balance y cuadre
-        features['has_saldo_cero'] = int(bool(self.patterns['saldo_cero'].search(text)))
-        features['is_cuadre_line'] = int(bool(self.patterns['cuadre'].search(text)))
-        
-        # Fechas contables
-        has_fecha = bool(
-            self.patterns['fecha_iso'].search(text) or 
-            self.patterns['fecha_euro'].search(text) or
-            self.patterns['fecha_compacta'].search(text)
-        )
-        features['has_fecha'] = int(has_fecha)
-        features['has_periodo'] = int(bool(self.patterns['periodo'].search(text)))
-        features['has_ejercicio'] = int(bool(self.patterns['ejercicio'].search(text)))
+        importe_count = len(self.patterns['importe_formal'].findall(text))
+        features['importe_count'] = importe_count
+        features['has_importe'] = int(importe_count > 0)
+        features['has_multiple_importes'] = int(importe_count >= 2)  # Debe y Haber
         
-        # Moneda
-        features['has_moneda'] = int(bool(self.patterns['moneda'].search(text)))
-        
-        # Códigos de documento
-        features['has_codigo_doc'] = int(bool(self.patterns['codigo_doc'].search(text)))
+        # Subcuentas, asientos, referencias, importes negativos, fechas, moneda, códigos...
+        features.update(zip(self.ACCOUNTING_FLAG_PATTERNS, self._accounting_flags(text)))
         
         # Para PARENT-CHILD: numeración de líneas
         if self.config.doc_type == DocumentType.PARENT_CHILD:
-            features['has_numero_linea'] = int(bool(self.patterns['numero_linea'].match(text)))
+            features['has_numero_linea'] = int(self.patterns['numero_linea'].match(text) is not None)
         
         # Patrones de debe/haber
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         features['has_debe_haber'] = int('debe' in text_lower or 'haber' in text_lower)
         features['has_cargo_abono'] = int('cargo' in text_lower or 'abono' in text_lower)
         
         # Detectar líneas de saldo o balance
         balance_indicators = ['saldo', 'balance', 'total', 'suma']
-        features['is_balance_line'] = int(any(ind in text_lower for ind in balance_indicators) and len(importes) > 0)
+        features['is_balance_line'] = int(any(ind in text_lower for ind in balance_indicators) and importe_count > 0)
         
         return features
     
@@ -248,38 +353,39 @@ class DocumentFeatureExtractor:
     # FEATURES DE KEYWORDS
     # ===========================
     
-    def extract_keyword_features(self, text: str) -> Dict[str, float]:
+    def extract_keyword_features(self, text: str, text_lower: Optional[str] = None) -> Dict[str, float]:
         """Features basadas en keywords específicos"""
         if not self.config.enable_keywords:
             return {}
             
         features = {}
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Headers
-        features['header_strong_kw'] = sum(1 for kw in self.keywords['header_strong'] if kw in text_lower)
-        features['header_weak_kw'] = sum(1 for kw in self.keywords['header_weak'] if kw in text_lower)
+        features['header_strong_kw'] = self._keyword_count('header_strong', text_lower)
+        features['header_weak_kw'] = self._keyword_count('header_weak', text_lower)
         features['is_header_candidate'] = int(
             features['header_strong_kw'] >= 2 or 
             (features['header_strong_kw'] >= 1 and features['header_weak_kw'] >= 1)
         )
         
         # Metadata
-        features['meta_kw'] = sum(1 for kw in self.keywords['meta'] if kw in text_lower)
+        features['meta_kw'] = self._keyword_count('meta', text_lower)
         features['is_meta'] = int(features['meta_kw'] >= 2)
         
         # Totales
-        features['total_kw'] = sum(1 for kw in self.keywords['total'] if kw in text_lower)
+        features['total_kw'] = self._keyword_count('total', text_lower)
         features['is_total'] = int(features['total_kw'] > 0)
         
         # Operaciones contables
-        features['operacion_kw'] = sum(1 for kw in self.keywords['operacion'] if kw in text_lower)
+        features['operacion_kw'] = self._keyword_count('operacion', text_lower)
         features['has_operacion'] = int(features['operacion_kw'] > 0)
         
         # Para PARENT-CHILD
         if self.config.doc_type == DocumentType.PARENT_CHILD:
-            features['parent_kw'] = sum(1 for kw in self.keywords['parent'] if kw in text_lower)
-            features['child_kw'] = sum(1 for kw in self.keywords['child'] if kw in text_lower)
+            features['parent_kw'] = self._keyword_count('parent', text_lower)
+            features['child_kw'] = self._keyword_count('child', text_lower)
             features['is_parent_candidate'] = int(features['parent_kw'] > 0)
             features['is_child_candidate'] = int(features['child_kw'] > 0)
         
@@ -296,35 +402,20 @@ class DocumentFeatureExtractor:
             
         features = {}
         
-        # Patrones de encabezado de página
-        page_patterns = [
-            r'pág\.?\s*\d+',  # Pág. 1
-            r'página\s*\d+',  # Página 1
-            r'hoja\s*\d+',    # Hoja 1
-            r'page\s*\d+',    # Page 1
-        ]
-        features['has_page_number'] = int(any(re.search(p, text, re.IGNORECASE) for p in page_patterns))
-        
-        # Patrones de continuación
-        continuation_patterns = [
-            r'suma y sigue',
-            r'van\s+[\d.,]+',
-            r'vienen\s+[\d.,]+',
-            r'arrastre',
-            r'carry\s*forward',
-        ]
-        features['has_continuation'] = int(any(re.search(p, text, re.IGNORECASE) for p in continuation_patterns))
+        # Patrones de encabezado de página (Pág. 1, Página 1, Hoja 1, Page 1)
+        features['has_page_number'] = int(self.patterns['page_number'].search(text) is not None)
+        
+        # Patrones de continuación (suma y sigue, van/vienen, arrastre, carry forward)
+        features['has_continuation'] = int(self.patterns['continuation'].search(text) is not None)
         
         # Líneas con asteriscos (común en totales)
         features['has_asterisks'] = int('**' in text or '***' in text)
         
         # Patrón de línea de detalle típica (número + texto + importes)
-        detail_pattern = r'^\s*\d+\s+.+\s+[\d.,]+\s+[\d.,]+\s*$'
-        features['is_detail_pattern'] = int(bool(re.match(detail_pattern, text)))
+        features['is_detail_pattern'] = int(self.patterns['detail_line'].match(text) is not None)
         
         # Detectar líneas con estructura cuenta-descripción
-        account_desc_pattern = r'^\s*\d{6,9}\s+[A-Za-záéíóúñÁÉÍÓÚÑ\s]+\s*'
-        features['has_account_description'] = int(bool(re.match(account_desc_pattern, text)))
+        features['has_account_description'] = int(self.patterns['account_description'].match(text) is not None)
         
         # Para HEADER-DATA: detectar estructura columnar consistente
         if self.config.doc_type == DocumentType.HEADER_DATA:
@@ -365,13 +456,12 @@ class DocumentFeatureExtractor:
         
         # Análisis de línea anterior
         if prev_text:
-            features['prev_is_separator'] = int(bool(self.patterns['separator'].search(prev_text)))
-            features['prev_is_empty'] = int(len(prev_text.strip()) == 0)
-            features['prev_has_total'] = int(any(kw in prev_text.lower() for kw in self.keywords['total']))
+            features['prev_is_separator'] = int(self.patterns['separator'].search(prev_text) is not None)
+            features['prev_is_empty'] = int(not prev_text.strip())
+            features['prev_has_total'] = int(self._keyword_count('total', prev_text.lower()) > 0)
             
             # Para importes
-            prev_importes = self.patterns['importe_formal'].findall(prev_text)
-            features['prev_has_importes'] = int(len(prev_importes) > 0)
+            features['prev_has_importes'] = int(self.patterns['importe_formal'].search(prev_text) is not None)
             
             # Continuidad de cuentas
             prev_cuenta = self.patterns['cuenta_contable'].search(prev_text)
@@ -383,9 +473,9 @@ class DocumentFeatureExtractor:
         
         # Análisis de línea siguiente
         if next_text:
-            features['next_is_separator'] = int(bool(self.patterns['separator'].search(next_text)))
-            features['next_is_empty'] = int(len(next_text.strip()) == 0)
-            features['next_has_importes'] = int(bool(self.patterns['importe_formal'].search(next_text)))
+            features['next_is_separator'] = int(self.patterns['separator'].search(next_text) is not None)
+            features['next_is_empty'] = int(not next_text.strip())
+            features['next_has_importes'] = int(self.patterns['importe_formal'].search(next_text) is not None)
         
         # Patrones de agrupación
         features['between_separators'] = int(
@@ -426,25 +516,303 @@ class DocumentFeatureExtractor:
     def extract_features(self, text: str, texts: List[str], index: int) -> Dict[str, float]:
         """Extrae todas las features configuradas para una línea"""
         features = {}
+        text_lower = text.lower()
         
         # Features por categoría
         features.update(self.extract_structural_features(text))
-        features.update(self.extract_accounting_features(text))
-        features.update(self.extract_keyword_features(text))
+        features.update(self.extract_accounting_features(text, text_lower))
+        features.update(self.extract_keyword_features(text, text_lower))
         features.update(self.extract_pattern_features(text))
         features.update(self.extract_contextual_features(texts, index))
         
         return features
     
     def extract_all_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Extrae features para todo el DataFrame"""
-        df = df.copy()
-        df['text'] = df['text'].fillna('').astype(str)
-        texts = df['text'].tolist()
+        """Extrae features para todo el DataFrame (por columnas, sin bucle por fila)"""
+        s = df['text'].fillna('').astype(str).reset_index(drop=True)
+        
+        # Las features de línea solo dependen del texto: se calculan una vez por texto distinto
+        # (separadores, líneas vacías, cabeceras repetidas por página...) y se expanden con take
+        codes, uniques = pd.factorize(s)
+        u = pd.Series(uniques, dtype=object)
+        u_lower = u.str.lower()
+        
+        # Fase 1: flags por línea compartidos entre categorías (una sola evaluación por texto)
+        u_flags = self._line_flags(u, u_lower)
+        
+        # Fase 2: features por categoría a partir de los flags y del texto
+        columns: Dict[str, pd.Series] = {}
+        if self.config.enable_structural:
+            columns.update(self._structural_columns(u, u_flags))
+        if self.config.enable_accounting:
+            columns.update(self._accounting_columns(u, u_lower, u_flags))
+        if self.config.enable_keywords:
+            columns.update(self._keyword_columns(u_lower, u_flags))
+        if self.config.enable_pattern:
+            columns.update(self._pattern_columns(u, u_flags))
+        
+        # Arrays ya tipados y contiguos: flags uint8, conteos int32, ratios float64
+        data = {name: self._compact_column(col)[codes] for name, col in columns.items()}
+        
+        # Las contextuales dependen del orden de las líneas: se trabajan sobre la columna expandida
+        if self.config.enable_contextual:
+            flags = {name: pd.Series(u_flags[name].to_numpy()[codes], index=s.index)
+                     for name in self.CONTEXTUAL_FLAGS}
+            contextual = self._contextual_columns(len(s), flags)
+            data.update((name, self._compact_column(col)) for name, col in contextual.items())
+        
+        return pd.DataFrame(data, index=s.index)
+    
+    # ===========================
+    # FEATURES POR COLUMNA
+    # ===========================
+    
+    @staticmethod
+    def _compact_column(col: pd.Series) -> np.ndarray:
+        """Valores de la columna como array numpy; los conteos int64 se reducen a int32"""
+        values = col.to_numpy()
+        if values.dtype == np.int64:
+            values = values.astype(np.int32)
+        return values
+    
+    def _line_flags(self, s: pd.Series, text_lower: pd.Series) -> Dict[str, pd.Series]:
+        """Flags por línea que usan varias categorías (la contextual los desplaza a prev/next)"""
+        length = s.str.len()
+        stripped = s.str.strip()
+        return {
+            'length': length,
+            'stripped': stripped,
+            'is_nonempty': length > 0,
+            'indent': length - s.str.lstrip().str.len(),
+            'is_separator': self._has_match(s, 'separator'),
+            'is_blank': stripped.str.len() == 0,
+            'importe_count': self._count_matches(s, 'importe_formal'),
+            'total_kw': self._count_keywords(text_lower, 'total'),
+            'cuenta_prefix': self._first_match_prefix(s, 'cuenta_contable', 3),
+        }
+    
+    @staticmethod
+    def _char_class_counts(text: str) -> Tuple[int, int, int, int]:
+        """Cuenta dígitos, letras, espacios y mayúsculas (entre letras) de una línea"""
+        # Una sola pasada en C: cada carácter se traduce a su clase y se cuentan las clases
+        classes = text.translate(_CHAR_CLASSES)
+        uppers = classes.count('u')
+        return (
+            classes.count('d'),
+            uppers + classes.count('l'),
+            classes.count('s'),
+            uppers,
+        )
+    
+    def _structural_columns(self, s: pd.Series, flags: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Versión por columnas de extract_structural_features"""
+        length = flags['length']
+        indent = flags['indent']
+        trailing = length - s.str.rstrip().str.len()
+        stripped = flags['stripped']
+        stripped_len = stripped.str.len()
+        column_gaps = s.str.count(r'\s{3,}')
+        
+        numeric_only = stripped.str.translate(_NUMERIC_SEPARATORS).str.isdigit()
+        
+        counts = pd.DataFrame(s.map(self._char_class_counts).tolist(),
+                              columns=['digits', 'letters', 'spaces', 'uppers'], index=s.index)
+        safe_length = length.where(length > 0, 1)
+        
+        return {
+            'length': length,
+            'indent': indent,
+            'trailing_spaces': trailing,
+            'column_gaps': column_gaps,
+            'has_columns': (column_gaps >= 2).astype(np.uint8),
+            'is_separator': flags['is_separator'].astype(np.uint8),
+            'is_empty': flags['is_blank'].astype(np.uint8),
+            'is_numeric_only': (numeric_only & (stripped_len > 0)).astype(np.uint8),
+            'is_centered': (
+                (stripped_len > 0) & (length > stripped_len) &
+                ((indent - trailing).abs() < 3) & (indent > 5)
+            ).astype(np.uint8),
+            'digit_ratio': counts['digits'] / safe_length,
+            'letter_ratio': counts['letters'] / safe_length,
+            'space_ratio': counts['spaces'] / safe_length,
+            'upper_ratio': counts['uppers'] / counts['letters'].clip(lower=1),
+        }
+    
+    def _accounting_columns(self, s: pd.Series, text_lower: pd.Series,
+                            flags: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Versión por columnas de extract_accounting_features"""
+        cuenta_count = self._count_matches(s, 'cuenta_contable')
+        importe_count = flags['importe_count']
+        
+        columns = {
+            'cuenta_count': cuenta_count,
+            'has_cuenta': (cuenta_count > 0).astype(np.uint8),
+            'importe_count': importe_count,
+            'has_importe': (importe_count > 0).astype(np.uint8),
+            'has_multiple_importes': (importe_count >= 2).astype(np.uint8),
+        }
+        
+        flags = pd.DataFrame(s.map(self._accounting_flags).tolist(),
+                             columns=list(self.ACCOUNTING_FLAG_PATTERNS), index=s.index, dtype=np.uint8)
+        columns.update(flags.items())
+        
+        if self.config.doc_type == DocumentType.PARENT_CHILD:
+            columns['has_numero_linea'] = self._matches_start(s, 'numero_linea').astype(np.uint8)
+        
+        columns['has_debe_haber'] = self._contains_any(text_lower, ('debe', 'haber')).astype(np.uint8)
+        columns['has_cargo_abono'] = self._contains_any(text_lower, ('cargo', 'abono')).astype(np.uint8)
+        columns['is_balance_line'] = (
+            self._contains_any(text_lower, ('saldo', 'balance', 'total', 'suma')) & (importe_count > 0)
+        ).astype(np.uint8)
+        
+        return columns
+    
+    def _has_match(self, s: pd.Series, name: str) -> pd.Series:
+        """True si el patrón aparece en la línea (equivale a pattern.search)"""
+        search = self._pattern_method(name, 'search')
+        return s.map(lambda text: search(text) is not None)
+    
+    def _matches_start(self, s: pd.Series, name: str) -> pd.Series:
+        """True si el patrón aparece al inicio de la línea (equivale a pattern.match)"""
+        match = self._pattern_method(name, 'match')
+        return s.map(lambda text: match(text) is not None)
+    
+    def _count_matches(self, s: pd.Series, name: str) -> pd.Series:
+        """Número de coincidencias del patrón en la línea (equivale a len(pattern.findall))"""
+        findall = self._pattern_method(name, 'findall')
+        return s.map(lambda text: len(findall(text))).astype(np.int64)
+    
+    def _first_match_prefix(self, s: pd.Series, name: str, size: int) -> pd.Series:
+        """Primeros caracteres de la primera coincidencia del patrón (NaN si no hay)"""
+        search = self._pattern_method(name, 'search')
         
-        all_features = []
-        for i, text in enumerate(texts):
-            features = self.extract_features(text, texts, i)
-            all_features.append(features)
+        def prefix(text: str):
+            m = search(text)
+            return m.group()[:size] if m is not None else np.nan
         
-        return pd.DataFrame(all_features)
+        return s.map(prefix)
+    
+    @staticmethod
+    def _contains_any(text_lower: pd.Series, keywords) -> pd.Series:
+        """True si la línea contiene alguno de los keywords (búsqueda literal)"""
+        result = pd.Series(False, index=text_lower.index)
+        for kw in keywords:
+            result |= text_lower.str.contains(kw, regex=False)
+        return result
+    
+    def _count_keywords(self, text_lower: pd.Series, group: str) -> pd.Series:
+        """Número de keywords distintos del grupo presentes en cada línea"""
+        # Igual que _keyword_count, con el autómata/keywords resueltos una vez por columna
+        automaton = self._keyword_automata.get(group)
+        if automaton is None:
+            keywords = self.keywords[group]
+            return text_lower.map(lambda text: sum(1 for kw in keywords if kw in text))
+        iter_matches = automaton.iter
+        return text_lower.map(lambda text: len({kw for _, kw in iter_matches(text)}))
+    
+    def _keyword_columns(self, text_lower: pd.Series, flags: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Versión por columnas de extract_keyword_features"""
+        header_strong = self._count_keywords(text_lower, 'header_strong')
+        header_weak = self._count_keywords(text_lower, 'header_weak')
+        meta = self._count_keywords(text_lower, 'meta')
+        total = flags['total_kw']
+        operacion = self._count_keywords(text_lower, 'operacion')
+        
+        columns = {
+            'header_strong_kw': header_strong,
+            'header_weak_kw': header_weak,
+            'is_header_candidate': (
+                (header_strong >= 2) | ((header_strong >= 1) & (header_weak >= 1))
+            ).astype(np.uint8),
+            'meta_kw': meta,
+            'is_meta': (meta >= 2).astype(np.uint8),
+            'total_kw': total,
+            'is_total': (total > 0).astype(np.uint8),
+            'operacion_kw': operacion,
+            'has_operacion': (operacion > 0).astype(np.uint8),
+        }
+        
+        if self.config.doc_type == DocumentType.PARENT_CHILD:
+            parent = self._count_keywords(text_lower, 'parent')
+            child = self._count_keywords(text_lower, 'child')
+            columns['parent_kw'] = parent
+            columns['child_kw'] = child
+            columns['is_parent_candidate'] = (parent > 0).astype(np.uint8)
+            columns['is_child_candidate'] = (child > 0).astype(np.uint8)
+        
+        return columns
+    
+    def _pattern_columns(self, s: pd.Series, flags: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Versión por columnas de extract_pattern_features"""
+        columns = {
+            'has_page_number': self._has_match(s, 'page_number').astype(np.uint8),
+            'has_continuation': self._has_match(s, 'continuation').astype(np.uint8),
+            'has_asterisks': s.str.contains('**', regex=False).astype(np.uint8),
+            'is_detail_pattern': self._matches_start(s, 'detail_line').astype(np.uint8),
+            'has_account_description': self._matches_start(s, 'account_description').astype(np.uint8),
+        }
+        
+        if self.config.doc_type == DocumentType.HEADER_DATA:
+            # re.split genera un trozo más que separadores encontrados
+            column_count = flags['stripped'].str.count(r'\s{3,}') + 1
+            columns['column_count'] = column_count
+            columns['has_columnar_structure'] = (column_count >= 3).astype(np.uint8)
+        else:
+            indent = flags['indent']
+            columns['indent_level'] = indent // 4
+            columns['is_indented'] = (indent > 0).astype(np.uint8)
+        
+        return columns
+    
+    def _contextual_columns(self, n: int, flags: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Versión por columnas de extract_contextual_features (flags por línea, en orden)"""
+        position = pd.Series(np.arange(n))
+        
+        # Flags por línea, calculados una sola vez y desplazados a prev/next
+        is_nonempty = flags['is_nonempty']
+        is_sep = flags['is_separator']
+        is_blank = flags['is_blank']
+        has_importes = flags['importe_count'] > 0
+        has_total = flags['total_kw'] > 0
+        cuenta_prefix = flags['cuenta_prefix']
+        
+        # Solo existen features de la línea anterior/siguiente si esa línea no está vacía
+        prev_exists = is_nonempty.shift(1, fill_value=False)
+        next_exists = is_nonempty.shift(-1, fill_value=False)
+        
+        prev_sep = is_sep.shift(1, fill_value=False)
+        next_sep = is_sep.shift(-1, fill_value=False)
+        prev_imp = has_importes.shift(1, fill_value=False)
+        next_imp = has_importes.shift(-1, fill_value=False)
+        
+        columns = {
+            'relative_position': position / max(1, n - 1),
+            'is_first_10': (position < 10).astype(np.uint8),
+            'is_last_10': (position >= n - 10).astype(np.uint8),
+            'prev_is_separator': prev_sep.astype(np.uint8),
+            'prev_is_empty': (prev_exists & is_blank.shift(1, fill_value=False)).astype(np.uint8),
+            'prev_has_total': has_total.shift(1, fill_value=False).astype(np.uint8),
+            'prev_has_importes': prev_imp.astype(np.uint8),
+            'cuenta_sequence': (
+                cuenta_prefix.notna() & (cuenta_prefix == cuenta_prefix.shift(1))
+            ).astype(np.uint8),
+            'next_is_separator': next_sep.astype(np.uint8),
+            'next_is_empty': (next_exists & is_blank.shift(-1, fill_value=False)).astype(np.uint8),
+            'next_has_importes': next_imp.astype(np.uint8),
+            'between_separators': (prev_sep & next_sep).astype(np.uint8),
+        }
+        
+        if self.config.doc_type == DocumentType.PARENT_CHILD:
+            indent = flags['indent']
+            prev_indent = indent.shift(1)
+            next_indent = indent.shift(-1)
+            columns['indent_increase'] = (prev_exists & (indent > prev_indent)).astype(np.uint8)
+            columns['indent_decrease'] = (prev_exists & (indent < prev_indent)).astype(np.uint8)
+            columns['same_indent'] = (prev_exists & (indent == prev_indent)).astype(np.uint8)
+            columns['next_indent_increase'] = (next_exists & (next_indent > indent)).astype(np.uint8)
+        
+        # Bloques de datos: solo para líneas interiores del documento
+        interior = (position > 0) & (position < n - 1)
+        columns['in_data_block'] = (interior & ~prev_sep & ~next_sep & (prev_imp | next_imp)).astype(np.uint8)
+        
+        return columns
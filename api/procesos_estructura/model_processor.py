@@ -1,4 +1,5 @@
 # procesos_estructura/model_processor.py
+import io
 import os
 import re
 import json
@@ -6,6 +7,7 @@ import pickle
 import numpy as np
 import pandas as pd
 import csv
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
 
 try:
@@ -16,9 +18,12 @@ except Exception:
 class LoadedModel:
     def __init__(self, model_dir: str):
         self.model_dir = model_dir
+        self.name = os.path.basename(model_dir)
         self.model = None
         self.label_encoder = None
         self.feature_names: Optional[List[str]] = None
+        self.classes: np.ndarray = np.asarray([])
+        self.prob_col_names: List[str] = []
         self.model_info: Dict[str, Any] = {}
 
     def load(self):
@@ -33,6 +38,8 @@ class LoadedModel:
             raise FileNotFoundError(f"No se encontró el label encoder en {encoder_file}")
         with open(encoder_file, "rb") as f:
             self.label_encoder = pickle.load(f)
+        self.classes = np.asarray(getattr(self.label_encoder, "classes_", []))
+        self.prob_col_names = [f"prob@{self.name}::{class_name}" for class_name in self.classes]
 
         features_file = os.path.join(self.model_dir, "feature_names.txt")
         if not os.path.exists(features_file):
@@ -51,28 +58,40 @@ class LoadedModel:
                 "classes": list(map(str, getattr(self.label_encoder, "classes_", []))),
             }
 
+@lru_cache(maxsize=8)
+def _load_model_cached(model_dir: str, model_mtime_ns: int) -> LoadedModel:
+    lm = LoadedModel(model_dir)
+    lm.load()
+    return lm
+
+def get_loaded_model(model_dir: str) -> LoadedModel:
+    """LoadedModel compartido por el proceso (solo lectura); se recarga si cambia model.pkl"""
+    try:
+        mtime_ns = os.stat(os.path.join(model_dir, "model.pkl")).st_mtime_ns
+    except OSError:
+        mtime_ns = -1  # load() lanzará el error correspondiente (las excepciones no se cachean)
+    return _load_model_cached(model_dir, mtime_ns)
+
 class DocumentPredict:
     def __init__(self, model_dirs: List[str]):
         if not model_dirs:
             raise ValueError("Debes proporcionar al menos un directorio de modelo.")
-        self.models: List[LoadedModel] = []
-        for md in model_dirs:
-            lm = LoadedModel(md)
-            lm.load()
-            self.models.append(lm)
+        # Los modelos se deserializan una vez por proceso, no en cada petición
+        self.models: List[LoadedModel] = [get_loaded_model(md) for md in model_dirs]
 
         self._last_is_txt = False
         self._fallback_thr = 0.7
         self._header_confidence_threshold = 0.7
 
     def _read_text_file(self, file_path: str, encoding: str = "utf-8") -> pd.DataFrame:
+        # Se recorre el archivo línea a línea: sin lista intermedia de readlines()
         with open(file_path, "r", encoding=encoding, errors="replace") as f:
-            lines = f.readlines()
+            texts = [line.rstrip("\r\n") for line in f]
         base = os.path.basename(file_path)
         return pd.DataFrame({
             "file": base,
-            "line_no": np.arange(1, len(lines) + 1),
-            "text": [line.rstrip("\r\n") for line in lines],
+            "line_no": np.arange(1, len(texts) + 1),
+            "text": texts,
             "label": "UNKNOWN",
         })
 
@@ -99,18 +118,40 @@ class DocumentPredict:
         enc_candidates = ([sniff] if sniff else []) + ["utf-16", "utf-8", "latin-1", "cp1252"]
         sep_candidates = [None, ",", ";", "\t", "|"]
 
+        # Cada codificación se valida decodificando en memoria igual que al abrir el archivo en
+        # modo texto: si falla, read_csv fallaría con todos los separadores y no se intenta
+        with open(file_path, "rb") as fb:
+            raw = fb.read()
+
         last_err = None
         for enc in enc_candidates:
+            try:
+                io.TextIOWrapper(io.BytesIO(raw), encoding=enc, newline="").read()
+            except (UnicodeError, LookupError) as e:
+                last_err = e
+                continue
             for sep in sep_candidates:
                 try:
                     df = pd.read_csv(file_path, dtype=str, sep=sep, encoding=enc, engine="python").fillna("")
-                    df = df.replace({r"\t": " | ", r"\\t": " | "}, regex=True)
+                    if len(df) == 0:
+                        raise ValueError("El CSV no tiene filas de datos")
                     
-                    texts = (
-                        df.apply(lambda row: " | ".join([c.strip() for c in row]), axis=1)
-                        .str.replace(r"\s*\|\s*", " | ", regex=True)
-                        .tolist()
-                    )
+                    # Tabuladores (reales o escritos como \t) -> " | "; después unir las columnas
+                    # (ya sin espacios) con " | ", columna a columna
+                    cols = [
+                        df[c].str.replace("\t", " | ", regex=False)
+                        .str.replace("\\t", " | ", regex=False)
+                        .str.strip()
+                        for c in df.columns
+                    ]
+                    if cols:
+                        texts = (
+                            cols[0].str.cat(cols[1:], sep=" | ")
+                            .str.replace(r"\s*\|\s*", " | ", regex=True)
+                            .tolist()
+                        )
+                    else:
+                        texts = [""] * len(df)
                     base = os.path.basename(file_path)
                     return pd.DataFrame({"file": base, "line_no": np.arange(1, len(texts)+1), "text": texts, "label": "UNKNOWN"})
                 except Exception as e:
@@ -135,16 +176,11 @@ class DocumentPredict:
 
     @staticmethod
     def _align_features(features_df: pd.DataFrame, expected_names: List[str]) -> pd.DataFrame:
-        missing = [c for c in expected_names if c not in features_df.columns]
-        for c in missing:
-            features_df[c] = 0
-        extra = [c for c in features_df.columns if c not in expected_names]
-        if extra:
-            features_df = features_df.drop(columns=extra)
-        features_df = features_df[expected_names]
-        for col in features_df.columns:
-            if features_df[col].dtype == "object":
-                features_df[col] = pd.to_numeric(features_df[col], errors="coerce").fillna(0)
+        # Un solo reindex: ordena, descarta las columnas sobrantes y crea las que faltan a 0
+        features_df = features_df.reindex(columns=expected_names, fill_value=0)
+        object_cols = [col for col, dtype in features_df.dtypes.items() if dtype == "object"]
+        for col in object_cols:
+            features_df[col] = pd.to_numeric(features_df[col], errors="coerce").fillna(0)
         return features_df.fillna(0)
 
     @staticmethod
@@ -175,56 +211,58 @@ class DocumentPredict:
             # This would need the actual dataframe, simplified for cleanup
             base_features = pd.DataFrame()
         
-        feats = self._align_features(base_features.copy(), lm.feature_names)
-        preds = lm.model.predict(feats)
-        if preds.dtype not in (np.int64, np.int32):
-            preds = preds.astype(int)
+        feats = self._align_features(base_features, lm.feature_names)
         
         if hasattr(lm.model, "predict_proba"):
-            probas = lm.model.predict_proba(feats)
+            # Una sola pasada por el modelo: la clase predicha es el argmax de las probabilidades
+            # (lo mismo que hace predict internamente), mapeado a classes_ si el modelo lo expone
+            probas = np.asarray(lm.model.predict_proba(feats))
+            preds = probas.argmax(axis=1)
+            model_classes = getattr(lm.model, "classes_", None)
+            if model_classes is not None:
+                preds = np.asarray(model_classes)[preds]
         else:
-            probas = np.zeros((len(preds), len(lm.label_encoder.classes_)))
-            for i, p in enumerate(preds):
-                probas[i, p] = 1.0
+            preds = np.asarray(lm.model.predict(feats))
+            probas = None
+        if preds.dtype not in (np.int64, np.int32):
+            preds = preds.astype(int)
+        
+        if probas is None:
+            # Probabilidad 1.0 en la clase predicha
+            probas = np.eye(len(lm.classes))[preds]
 
-        final_labels = []
-        final_confidences = []
+        classes = lm.classes
+        rows = np.arange(len(preds))
+        final_idx = preds
+        final_confidences = probas[rows, preds]
         
-        for i, (pred_idx, row_probas) in enumerate(zip(preds, probas)):
-            original_label = lm.label_encoder.inverse_transform([pred_idx])[0]
-            original_confidence = row_probas[pred_idx]
+        # HEADER con baja confianza -> la clase no-HEADER más probable, si supera 0.1
+        header_positions = np.flatnonzero(classes == "HEADER")
+        if header_positions.size:
+            header_idx = header_positions[0]
+            alt_probas = probas.astype(float, copy=True)
+            alt_probas[:, header_idx] = -np.inf
+            alt_idx = alt_probas.argmax(axis=1)
+            alt_confidences = alt_probas[rows, alt_idx]
             
-            if original_label == "HEADER" and original_confidence < self._header_confidence_threshold:
-                sorted_indices = np.argsort(row_probas)[::-1]
-                
-                fallback_found = False
-                for idx in sorted_indices:
-                    candidate_label = lm.label_encoder.inverse_transform([idx])[0]
-                    candidate_confidence = row_probas[idx]
-                    
-                    if candidate_label != "HEADER" and candidate_confidence > 0.1:
-                        final_labels.append(candidate_label)
-                        final_confidences.append(candidate_confidence)
-                        fallback_found = True
-                        print(f"HEADER fallback: línea {i+1} - {original_label}({original_confidence:.3f}) -> {candidate_label}({candidate_confidence:.3f})")
-                        break
-                
-                if not fallback_found:
-                    final_labels.append(original_label)
-                    final_confidences.append(original_confidence)
-            else:
-                final_labels.append(original_label)
-                final_confidences.append(original_confidence)
+            fallback = (preds == header_idx) & (final_confidences < self._header_confidence_threshold) & (alt_confidences > 0.1)
+            if fallback.any():
+                print("\n".join(
+                    f"HEADER fallback: línea {i+1} - HEADER({final_confidences[i]:.3f}) -> {classes[alt_idx[i]]}({alt_confidences[i]:.3f})"
+                    for i in np.flatnonzero(fallback)
+                ))
+                final_idx = np.where(fallback, alt_idx, preds)
+                final_confidences = np.where(fallback, alt_confidences, final_confidences)
+        
+        final_labels = classes[final_idx]
 
         dfm = pd.DataFrame({
             "predicted_label": final_labels,
             "confidence": final_confidences,
         })
         
-        for i, class_name in enumerate(lm.label_encoder.classes_):
-            dfm[f"prob@{os.path.basename(lm.model_dir)}::{class_name}"] = probas[:, i]
-        
-        return dfm
+        # Probabilidades por clase como un único bloque 2D (no columna a columna)
+        return pd.concat([dfm, pd.DataFrame(probas, columns=lm.prob_col_names)], axis=1)
 
     def predict_file(self, test_df: pd.DataFrame) -> pd.DataFrame:
         print("Extrayendo features del archivo de test...")
@@ -232,9 +270,9 @@ class DocumentPredict:
         # Import here to avoid circular imports
         from procesos_estructura.feature_processor import DocumentFeatureExtractor
         
-        tmp_df = test_df.copy()
+        tmp_df = test_df
         if not self._last_is_txt:
-            tmp_df["text"] = tmp_df["text"].str.replace("|", " ", regex=False)
+            tmp_df = test_df.assign(text=test_df["text"].str.replace("|", " ", regex=False))
 
         feature_extractor = DocumentFeatureExtractor()
         base_features = feature_extractor.extract_all_features(tmp_df).reset_index(drop=True)
@@ -265,13 +303,14 @@ class DocumentPredict:
 
         print(f"Modelo usado para TODO el archivo: {os.path.basename(chosen_dir)} [{chosen_role}] (conf media={chosen_dfm['confidence'].mean():.3f})")
 
-        results_df = test_df.copy().reset_index(drop=True)
-        results_df["predicted_label"] = chosen_dfm["predicted_label"]
-        results_df["confidence"] = chosen_dfm["confidence"]
-        
-        for c in chosen_dfm.columns:
-            if c not in ["predicted_label", "confidence"]:
-                results_df[c] = chosen_dfm[c].values
+        # Predicción, confianza y probabilidades se añaden de una vez (sin asignar columna a columna)
+        results_df = pd.concat(
+            [
+                test_df.drop(columns=chosen_dfm.columns, errors="ignore").reset_index(drop=True),
+                chosen_dfm.reset_index(drop=True),
+            ],
+            axis=1,
+        )
 
         return results_df
 
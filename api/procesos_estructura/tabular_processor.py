@@ -1,7 +1,19 @@
 # procesos_estructura/tabular_processor.py
 import pandas as pd
 import re
-from typing import List, Tuple
+from itertools import islice
+from typing import Iterator, List, Tuple
+
+# Número de líneas que se procesan de una vez al leer CSV tabulares grandes
+TABULAR_CHUNK_LINES = 100_000
+
+# Limpieza de nombres de columna: caracteres no permitidos y espacios -> '_'
+_COLUMN_INVALID_CHARS = re.compile(r'[^\w\s\.\-]')
+_COLUMN_WHITESPACE = re.compile(r'\s+')
+
+# Palabras que identifican columnas de importes y de fechas (sobre el nombre en minúsculas)
+_NUMERIC_COLUMN_WORDS = re.compile(r'debe|haber|moneda|importe')
+_DATE_COLUMN_WORDS = re.compile(r'fecha|registrado')
 
 def extract_columns_from_section(section_text: str) -> Tuple[List[str], List[int]]:
     """
@@ -17,20 +29,13 @@ def extract_columns_from_section(section_text: str) -> Tuple[List[str], List[int
     # Dividir por |
     raw_columns = clean_text.split('|')
     
-    # Limpiar y procesar cada columna
-    columns = []
-    valid_indices = []  # Índices de columnas que tienen nombre
+    # Limpiar cada columna con nombre válido (índice, nombre limpio) y descartar las que quedan vacías
+    named = [(i, col) for i, col in enumerate(col.strip() for col in raw_columns) if col and col != '.']
+    cleaned = [(i, _COLUMN_WHITESPACE.sub('_', _COLUMN_INVALID_CHARS.sub('', col).strip())) for i, col in named]
+    cleaned = [(i, col) for i, col in cleaned if col]
     
-    for i, col in enumerate(raw_columns):
-        col = col.strip()
-        
-        if col and col != '.' and col != '':
-            # Columna con nombre válido - limpiar pero mantener original
-            clean_col = re.sub(r'[^\w\s\.\-]', '', col)
-            clean_col = re.sub(r'\s+', '_', clean_col.strip())
-            if clean_col:
-                columns.append(clean_col)
-                valid_indices.append(i)
+    columns = [col for _, col in cleaned]
+    valid_indices = [i for i, _ in cleaned]  # Índices de columnas que tienen nombre
     
     return columns, valid_indices
 
@@ -93,6 +98,25 @@ def clean_numeric_field(value):
     result = f"-{cleaned}" if is_negative else cleaned
     return result
 
+def convert_unique_values(series: pd.Series, convert) -> pd.Series:
+    """
+    Aplica convert solo a los valores distintos (no nulos) de la serie y expande
+    el resultado a todas las filas; los nulos quedan como NaN/NaT
+    """
+    if not isinstance(series, pd.Series):
+        # Columnas duplicadas (df[col] es un DataFrame): conversión directa
+        return convert(series)
+    codes, uniques = pd.factorize(series)
+    converted = convert(pd.Series(uniques, dtype=object))
+    # codes = posición en uniques (-1 para nulos): reindex los deja como NaN/NaT
+    return converted.reset_index(drop=True).reindex(codes).set_axis(series.index)
+
+def _to_numeric_values(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values.apply(clean_numeric_field), errors='coerce')
+
+def _to_datetime_values(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, errors='coerce', dayfirst=True)
+
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Limpia el DataFrame
@@ -100,16 +124,18 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # Reemplazar strings vacíos con NaN
     df = df.replace('', pd.NA)
     
+    # Importes y fechas se repiten mucho: cada valor distinto se convierte una sola vez
+    
+    numeric_cols = [col for col in df.columns if _NUMERIC_COLUMN_WORDS.search(col.lower())]
+    date_cols = [col for col in df.columns if _DATE_COLUMN_WORDS.search(col.lower())]
+    
     # Convertir columnas numéricas
-    for col in df.columns:
-        if any(word in col.lower() for word in ['debe', 'haber', 'moneda', 'importe']):
-            df[col] = df[col].apply(clean_numeric_field)
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in numeric_cols:
+        df[col] = convert_unique_values(df[col], _to_numeric_values)
     
     # Convertir fechas
-    for col in df.columns:
-        if any(word in col.lower() for word in ['fecha', 'registrado']):
-            df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+    for col in date_cols:
+        df[col] = convert_unique_values(df[col], _to_datetime_values)
     
     return df
 
@@ -127,17 +153,35 @@ def process_csv_tabular(file_path: str, output_path: str = None) -> pd.DataFrame
         DataFrame con todas las columnas combinadas
     """
     
-    # Leer archivo línea por línea
+    # Leer archivo línea por línea, sin cargarlo entero en memoria
     with open(file_path, 'r', encoding='utf-8') as file:
-        lines = [line.strip() for line in file.readlines() if line.strip()]
+        lines = (line for line in (raw.strip() for raw in file) if line)
+        first_line = next(lines, None)
+        
+        if first_line is None:
+            raise ValueError("El archivo está vacío")
+        
+        df = _build_tabular_dataframe(first_line, lines)
+    
+    print(f"\nDataFrame creado: {df.shape[0]} filas × {df.shape[1]} columnas")
     
-    if not lines:
-        raise ValueError("El archivo está vacío")
+    # Limpiar datos
+    df = clean_dataframe(df)
     
-    print(f"Procesando {len(lines)} líneas...")
+    # Guardar si se especifica ruta
+    if output_path:
+        df.to_csv(output_path, index=False, encoding='utf-8')
+        print(f"Archivo guardado: {output_path}")
     
+    return df
+
+def _build_tabular_dataframe(first_line: str, lines: Iterator[str]) -> pd.DataFrame:
+    """
+    Construye el DataFrame a partir de la cabecera y del resto de líneas (no vacías),
+    procesándolas en bloques de TABULAR_CHUNK_LINES para no materializar el archivo
+    completo ni una única lista gigante de filas.
+    """
     # Procesar primera línea para obtener headers
-    first_line = lines[0]
     print(f"Primera línea: {first_line[:100]}...")
     
     # Verificar si hay dos secciones (buscar primera coma)
@@ -180,10 +224,36 @@ def process_csv_tabular(file_path: str, output_path: str = None) -> pd.DataFrame
         print(f"  Sección única ({len(headers1)}): {headers1}")
         print(f"  Total columnas válidas: {len(all_headers)}")
     
-    # Procesar el resto de las líneas
+    # Procesar el resto de las líneas por bloques
+    chunks = []
+    line_number = 2
+    
+    while True:
+        batch = list(islice(lines, TABULAR_CHUNK_LINES))
+        if not batch:
+            break
+        all_data = _rows_from_lines(batch, line_number, has_two_sections,
+                                    valid_indices1, valid_indices2, len(headers1), len(headers2))
+        chunks.append(pd.DataFrame(all_data, columns=all_headers))
+        line_number += len(batch)
+    
+    print(f"Procesadas {line_number - 1} líneas")
+    
+    if not chunks:
+        return pd.DataFrame([], columns=all_headers)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+def _rows_from_lines(lines: List[str], start: int, has_two_sections: bool,
+                     valid_indices1: List[int], valid_indices2: List[int],
+                     n_headers1: int, n_headers2: int) -> List[List[str]]:
+    """
+    Convierte un bloque de líneas en filas de datos.
+    """
     all_data = []
     
-    for i, line in enumerate(lines[1:], start=2):
+    for i, line in enumerate(lines, start=start):
         try:
             if has_two_sections:
                 # Procesar línea con dos secciones
@@ -215,25 +285,12 @@ def process_csv_tabular(file_path: str, output_path: str = None) -> pd.DataFrame
             print(f"Error en línea {i}: {e}")
             # Crear fila vacía si hay error
             if has_two_sections:
-                empty_data1 = [''] * len(headers1)
-                empty_data2 = [''] * len(headers2)
+                empty_data1 = [''] * n_headers1
+                empty_data2 = [''] * n_headers2
                 all_data.append(empty_data1 + empty_data2)
             else:
-                empty_data = [''] * len(headers1)
+                empty_data = [''] * n_headers1
                 all_data.append(empty_data)
     
-    # Crear DataFrame
-    df = pd.DataFrame(all_data, columns=all_headers)
-    
-    print(f"\nDataFrame creado: {df.shape[0]} filas × {df.shape[1]} columnas")
-    
-    # Limpiar datos
-    df = clean_dataframe(df)
-    
-    # Guardar si se especifica ruta
-    if output_path:
-        df.to_csv(output_path, index=False, encoding='utf-8')
-        print(f"Archivo guardado: {output_path}")
-    
-    return df
+    return all_data
 
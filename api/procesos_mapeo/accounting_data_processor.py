@@ -1,4 +1,5 @@
 # procesos_mapeo/accounting_data_processor.py
+import numpy as np
 import pandas as pd
 import re
 import logging
@@ -7,6 +8,106 @@ from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+# Patrones de fecha/hora; cada clase se compila una sola vez como una única alternancia
+_PURE_DATE_PATTERNS = (
+    r'^\d{1,2}\.\d{1,2}\.\d{4}$',
+    r'^\d{1,2}/\d{1,2}/\d{4}$',
+    r'^\d{1,2}-\d{1,2}-\d{4}$',
+    r'^\d{4}-\d{2}-\d{2}$',
+    r'^\d{4}/\d{2}/\d{2}$',
+    r'^\d{4}\.\d{2}\.\d{2}$',
+    r'^\d{8}$',
+)
+
+_PURE_TIME_PATTERNS = (
+    r'^\d{1,2}:\d{2}:\d{2}$',
+    r'^\d{1,2}:\d{2}$',
+    r'^\d{1,2}:\d{2}:\d{2}\.\d+$',
+)
+
+_COMBINED_DATETIME_PATTERNS = (
+    r'\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}',
+    r'\d{1,2}/\d{1,2}/\d{4}\s+\d{1,2}:\d{2}',
+    r'\d{1,2}-\d{1,2}-\d{4}\s+\d{1,2}:\d{2}',
+    r'\d{1,2}\.\d{1,2}\.\d{4}\s+\d{1,2}:\d{2}',
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',
+)
+
+def _compile_alternation(patterns) -> re.Pattern:
+    return re.compile('|'.join(f'(?:{p})' for p in patterns))
+
+_PURE_DATE_RE = _compile_alternation(_PURE_DATE_PATTERNS)
+_PURE_TIME_RE = _compile_alternation(_PURE_TIME_PATTERNS)
+_COMBINED_DATETIME_RE = _compile_alternation(_COMBINED_DATETIME_PATTERNS)
+
+# Limpieza de importes: número entre paréntesis (negativo) y caracteres no numéricos
+_PARENTHESES_NUMBER_RE = re.compile(r'\([^)]*\d+[^)]*\)')
+_NON_NUMERIC_CHARS_RE = re.compile(r'[^\d.,\-]')
+# Número ya limpio: sin miles y como mucho 2 decimales ("1.234" se trata como miles, no aquí)
+_PLAIN_NUMBER_RE = re.compile(r'-?[0-9]+(?:\.[0-9]{1,2})?')
+_FIRST_NUMBER_RE = re.compile(r'-?\d+\.?\d*')
+
+# Valores (normalizados) del indicador debe/haber
+_DEBIT_PATTERNS = frozenset({'D', 'DEBE', 'DEBIT', 'DR', 'DB', '1', 'S'})
+_CREDIT_PATTERNS = frozenset({'C', 'H', 'HABER', 'CREDIT', 'CR', 'CD', '0', '-1', 'N'})
+
+# (patrón, formato, dayfirst) para deducir el formato de la primera muestra que encaje;
+# formato None = sin formato fijo, dayfirst se deduce del propio valor
+_PURE_DATE_FORMATS = [
+    (re.compile(r'^\d{1,2}\.\d{1,2}\.\d{4}$'), '%d.%m.%Y', True),
+    (re.compile(r'^\d{4}-\d{2}-\d{2}$'), '%Y-%m-%d', False),
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$'), None, True),
+]
+
+_COMBINED_DATETIME_FORMATS = [
+    (re.compile(r'\d{1,2}\.\d{1,2}\.\d{4}\s+\d{1,2}:\d{2}'), '%d.%m.%Y %H:%M:%S', True),
+    (re.compile(r'\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}'), '%Y-%m-%d %H:%M:%S', False),
+    (re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}'), '%Y-%m-%dT%H:%M:%S', False),
+]
+
+def _split_datetime_values(values: List[str], detected_format: Optional[str],
+                           detected_dayfirst: bool) -> Dict[str, Tuple[str, str]]:
+    """Splits distinct combined date-time strings into (date, time) strings.
+    With a detected format all values are parsed in one pd.to_datetime call; only the ones
+    that do not match it are parsed one by one with dayfirst. Unparseable values keep the
+    original text as date and an empty time"""
+    parsed_values = [pd.NaT] * len(values)
+    if detected_format and values:
+        try:
+            parsed_values = list(pd.to_datetime(pd.Series(values, dtype=object), format=detected_format, errors='coerce'))
+        except Exception:
+            pass
+    
+    result = {}
+    for str_value, parsed_dt in zip(values, parsed_values):
+        try:
+            if parsed_dt is pd.NaT:
+                parsed_dt = pd.to_datetime(str_value, dayfirst=detected_dayfirst, errors='raise')
+            
+            if '.' in str_value:
+                date_str = parsed_dt.strftime('%d.%m.%Y')
+            elif '/' in str_value:
+                date_str = parsed_dt.strftime('%d/%m/%Y')
+            else:
+                date_str = parsed_dt.strftime('%Y-%m-%d')
+            
+            result[str_value] = (date_str, parsed_dt.strftime('%H:%M:%S'))
+        except Exception:
+            result[str_value] = (str_value, '')
+    return result
+
+def _parse_first_number(cleaned: str) -> Optional[float]:
+    """Value of the first number in cleaned (as matched by _FIRST_NUMBER_RE).
+    After cleaning the whole string is usually that number, so float() is tried first;
+    a leading '.' is excluded because the pattern would skip it"""
+    if not cleaned.startswith(('.', '-.')):
+        try:
+            return float(cleaned)
+        except ValueError:
+            pass
+    first_num = _FIRST_NUMBER_RE.search(cleaned)
+    return float(first_num.group()) if first_num else None
+
 class AccountingDataProcessor:
     """Reusable processor for accounting data with numeric cleaning and calculations"""
     
@@ -41,69 +142,34 @@ class AccountingDataProcessor:
                 detected_format = None
                 detected_dayfirst = True
                 
-                for value in sample_values:
+                for value in sample_values.tolist():
                     str_value = str(value).strip()
                     
-                    pure_date_patterns = [
-                        r'^\d{1,2}\.\d{1,2}\.\d{4}$',
-                        r'^\d{1,2}/\d{1,2}/\d{4}$',
-                        r'^\d{1,2}-\d{1,2}-\d{4}$',
-                        r'^\d{4}-\d{2}-\d{2}$',
-                        r'^\d{4}/\d{2}/\d{2}$',
-                        r'^\d{4}\.\d{2}\.\d{2}$',
-                        r'^\d{8}$',
-                    ]
-                    
-                    pure_time_patterns = [
-                        r'^\d{1,2}:\d{2}:\d{2}$',
-                        r'^\d{1,2}:\d{2}$',
-                        r'^\d{1,2}:\d{2}:\d{2}\.\d+$',
-                    ]
-                    
-                    if any(re.match(pattern, str_value) for pattern in pure_date_patterns):
+                    if _PURE_DATE_RE.match(str_value):
                         pure_date_count += 1
                         if not detected_format:
-                            if re.match(r'^\d{1,2}\.\d{1,2}\.\d{4}$', str_value):
-                                detected_format = '%d.%m.%Y'
-                                detected_dayfirst = True
-                            elif re.match(r'^\d{4}-\d{2}-\d{2}$', str_value):
-                                detected_format = '%Y-%m-%d'
-                                detected_dayfirst = False
-                            elif re.match(r'^\d{1,2}/\d{1,2}/\d{4}$', str_value):
-                                detected_dayfirst = True
+                            for regex, fmt, dayfirst in _PURE_DATE_FORMATS:
+                                if regex.match(str_value):
+                                    detected_format = fmt
+                                    detected_dayfirst = dayfirst
+                                    break
                             else:
                                 detected_dayfirst = '.' in str_value or not str_value.startswith(('20', '19'))
                         continue
-                    elif any(re.match(pattern, str_value) for pattern in pure_time_patterns):
+                    elif _PURE_TIME_RE.match(str_value):
                         pure_time_count += 1
                         continue
                     
-                    combined_datetime_patterns = [
-                        r'\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}',
-                        r'\d{1,2}/\d{1,2}/\d{4}\s+\d{1,2}:\d{2}',
-                        r'\d{1,2}-\d{1,2}-\d{4}\s+\d{1,2}:\d{2}',
-                        r'\d{1,2}\.\d{1,2}\.\d{4}\s+\d{1,2}:\d{2}',
-                        r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',
-                    ]
-                    
-                    for pattern in combined_datetime_patterns:
-                        if re.search(pattern, str_value):
-                            datetime_detected = True
-                            if not detected_format:
-                                if re.search(r'\d{1,2}\.\d{1,2}\.\d{4}\s+\d{1,2}:\d{2}', str_value):
-                                    detected_format = '%d.%m.%Y %H:%M:%S'
-                                    detected_dayfirst = True
-                                elif re.search(r'\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}', str_value):
-                                    detected_format = '%Y-%m-%d %H:%M:%S'
-                                    detected_dayfirst = False
-                                elif re.search(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}', str_value):
-                                    detected_format = '%Y-%m-%dT%H:%M:%S'
-                                    detected_dayfirst = False
-                                else:
-                                    detected_dayfirst = '.' in str_value or ('/' in str_value and not str_value.startswith(('20', '19')))
-                            break
-                    
-                    if datetime_detected:
+                    if _COMBINED_DATETIME_RE.search(str_value):
+                        datetime_detected = True
+                        if not detected_format:
+                            for regex, fmt, dayfirst in _COMBINED_DATETIME_FORMATS:
+                                if regex.search(str_value):
+                                    detected_format = fmt
+                                    detected_dayfirst = dayfirst
+                                    break
+                            else:
+                                detected_dayfirst = '.' in str_value or ('/' in str_value and not str_value.startswith(('20', '19')))
                         break
                 
                 total_samples = len(sample_values)
@@ -120,58 +186,31 @@ class AccountingDataProcessor:
                 elif not datetime_detected:
                     return False
                 
-                dates = []
-                times = []
+                # tolist() en lugar de iterar la Series (mismos escalares, sin el iterador de pandas);
+                # los nulos se detectan de una vez con isna()
+                column = df[field_name]
+                str_values = [
+                    None if is_null or value == '' else str(value).strip()
+                    for value, is_null in zip(column.tolist(), column.isna().tolist())
+                ]
                 
-                for value in df[field_name]:
-                    if pd.isna(value) or value == '':
-                        dates.append('')
-                        times.append('')
-                        continue
-                    
-                    str_value = str(value).strip()
-                    
-                    if any(re.match(pattern, str_value) for pattern in pure_date_patterns):
-                        dates.append(str_value)
-                        times.append('')
-                        continue
-                    
-                    if any(re.match(pattern, str_value) for pattern in pure_time_patterns):
-                        dates.append('')
-                        times.append(str_value)
-                        continue
-                    
-                    has_space_and_colon = ' ' in str_value and ':' in str_value
-                    has_t_separator = 'T' in str_value and ':' in str_value
-                    
-                    if has_space_and_colon or has_t_separator:
-                        try:
-                            if detected_format:
-                                try:
-                                    parsed_dt = pd.to_datetime(str_value, format=detected_format)
-                                except:
-                                    parsed_dt = pd.to_datetime(str_value, dayfirst=detected_dayfirst, errors='raise')
-                            else:
-                                parsed_dt = pd.to_datetime(str_value, dayfirst=detected_dayfirst, errors='raise')
-                            
-                            if '.' in str_value:
-                                date_str = parsed_dt.strftime('%d.%m.%Y')
-                            elif '/' in str_value:
-                                date_str = parsed_dt.strftime('%d/%m/%Y')
-                            else:
-                                date_str = parsed_dt.strftime('%Y-%m-%d')
-                            
-                            time_str = parsed_dt.strftime('%H:%M:%S')
-                            
-                            dates.append(date_str)
-                            times.append(time_str)
-                            
-                        except Exception as e:
-                            dates.append(str_value)
-                            times.append('')
+                # Cada valor distinto se clasifica (y, si es fecha+hora, se analiza) una sola vez
+                split_values: Dict[str, Tuple[str, str]] = {}
+                datetime_values = []
+                for str_value in dict.fromkeys(v for v in str_values if v is not None):
+                    if _PURE_DATE_RE.match(str_value):
+                        split_values[str_value] = (str_value, '')
+                    elif _PURE_TIME_RE.match(str_value):
+                        split_values[str_value] = ('', str_value)
+                    elif ':' in str_value and (' ' in str_value or 'T' in str_value):
+                        datetime_values.append(str_value)
                     else:
-                        dates.append(str_value)
-                        times.append('')
+                        split_values[str_value] = (str_value, '')
+                
+                split_values.update(_split_datetime_values(datetime_values, detected_format, detected_dayfirst))
+                
+                dates = [split_values[v][0] if v is not None else '' for v in str_values]
+                times = [split_values[v][1] if v is not None else '' for v in str_values]
                 
                 if any(time for time in times if time):
                     if field_name == 'entry_date':
@@ -188,12 +227,13 @@ class AccountingDataProcessor:
                     
                     df[date_field] = dates
                     
-                    if time_field not in df.columns or df[time_field].isna().all():
+                    existing_columns = set(df.columns)
+                    if time_field not in existing_columns or df[time_field].isna().all():
                         df[time_field] = times
                     else:
                         counter = 1
                         new_time_field = f"{time_field}_{counter}"
-                        while new_time_field in df.columns:
+                        while new_time_field in existing_columns:
                             counter += 1
                             new_time_field = f"{time_field}_{counter}"
                         df[new_time_field] = times
@@ -247,9 +287,7 @@ class AccountingDataProcessor:
         
         for field in numeric_fields:
             if field in df.columns:
-                parentheses_count = df[field].astype(str).str.contains(r'\(', na=False).sum()
-                
-                df[field] = df[field].apply(self._clean_numeric_value_with_zero_fill)
+                df[field], parentheses_count = self._clean_numeric_series(df[field])
                 
                 zero_count = (df[field] == 0.0).sum()
                 self.stats['zero_filled_fields'] += zero_count
@@ -267,25 +305,31 @@ class AccountingDataProcessor:
         df['debit_amount'] = 0.0
         df['credit_amount'] = 0.0
         
-        df['debit_credit_indicator'] = df['debit_credit_indicator'].fillna('').astype(str).str.strip().str.upper()
+        # El indicador tiene muy pocos valores distintos: se normalizan y clasifican los
+        # valores distintos y se expanden a todas las filas por su código
+        indicator_codes, indicator_values = pd.factorize(df['debit_credit_indicator'].fillna('').astype(str))
+        indicator_values = np.array([value.strip().upper() for value in indicator_values], dtype=object)
+        df['debit_credit_indicator'] = indicator_values[indicator_codes]
         
-        debit_patterns = ['D', 'DEBE', 'DEBIT', 'DR', 'DB', '1', 'S']
-        credit_patterns = ['C', 'H', 'HABER', 'CREDIT', 'CR', 'CD', '0', '-1', 'N']
+        debit_mask = np.array([value in _DEBIT_PATTERNS for value in indicator_values], dtype=bool)[indicator_codes]
+        credit_mask = np.array([value in _CREDIT_PATTERNS for value in indicator_values], dtype=bool)[indicator_codes]
         
-        is_debit = df['debit_credit_indicator'].isin(debit_patterns)
-        is_credit = df['debit_credit_indicator'].isin(credit_patterns)
+        # Valor absoluto calculado una vez por grupo y escrito con máscaras sobre arrays numpy
+        amounts = df['amount'].to_numpy()
         
-        df.loc[is_debit, 'debit_amount'] = df.loc[is_debit, 'amount'].abs()
-        df.loc[is_debit, 'credit_amount'] = 0.0
+        debit_abs = np.abs(amounts[debit_mask])
+        df['debit_amount'] = self._zero_filled_column(len(df), debit_mask, debit_abs)
         
-        df.loc[is_credit, 'debit_amount'] = 0.0
-        df.loc[is_credit, 'credit_amount'] = df.loc[is_credit, 'amount'].abs()
+        credit_abs = np.abs(amounts[credit_mask])
+        df['credit_amount'] = self._zero_filled_column(len(df), credit_mask, credit_abs)
         
-        df.loc[is_credit, 'amount'] = -df.loc[is_credit, 'amount'].abs()
-        df.loc[is_debit, 'amount'] = df.loc[is_debit, 'amount'].abs()
+        signed_amounts = amounts.copy()
+        signed_amounts[credit_mask] = -credit_abs
+        signed_amounts[debit_mask] = debit_abs
+        df['amount'] = signed_amounts
         
-        debit_assigned = is_debit.sum()
-        credit_assigned = is_credit.sum()
+        debit_assigned = debit_mask.sum()
+        credit_assigned = credit_mask.sum()
         
         self.stats['debit_credit_calculated'] = debit_assigned + credit_assigned
         self.stats['debit_amounts_from_indicator'] = debit_assigned
@@ -294,24 +338,30 @@ class AccountingDataProcessor:
         
         return df
     
+    @staticmethod
+    def _zero_filled_column(length: int, mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+        # Columna de 0.0 con values en las filas de mask; el dtype sigue al de values
+        # (p. ej. object) igual que al asignar con .loc sobre una columna float no vacía
+        dtype = np.result_type(values.dtype, np.float64) if length else np.float64
+        column = np.full(length, 0.0, dtype=dtype)
+        column[mask] = values
+        return column
+    
     def _handle_amount_only_scenario(self, df: pd.DataFrame) -> pd.DataFrame:
         df['debit_amount'] = 0.0
         df['credit_amount'] = 0.0
         
-        df['amount'] = df['amount'].apply(self._clean_numeric_value_with_zero_fill)
+        df['amount'], _ = self._clean_numeric_series(df['amount'])
         
         positive_amounts = df['amount'] > 0
         negative_amounts = df['amount'] < 0
-        zero_amounts = df['amount'] == 0
-        
-        df.loc[positive_amounts, 'debit_amount'] = df.loc[positive_amounts, 'amount'].abs()
-        df.loc[positive_amounts, 'credit_amount'] = 0.0
-        
-        df.loc[negative_amounts, 'debit_amount'] = 0.0
-        df.loc[negative_amounts, 'credit_amount'] = df.loc[negative_amounts, 'amount'].abs()
         
-        df.loc[zero_amounts, 'debit_amount'] = 0.0
-        df.loc[zero_amounts, 'credit_amount'] = 0.0
+        # Positivos -> debe y negativos -> haber (en valor absoluto); ceros y nulos quedan a 0.0
+        amounts = df['amount'].to_numpy()
+        positive_mask = positive_amounts.to_numpy()
+        negative_mask = negative_amounts.to_numpy()
+        df['debit_amount'] = self._zero_filled_column(len(df), positive_mask, np.abs(amounts[positive_mask]))
+        df['credit_amount'] = self._zero_filled_column(len(df), negative_mask, np.abs(amounts[negative_mask]))
         
         positive_count = positive_amounts.sum()
         negative_count = negative_amounts.sum()
@@ -321,6 +371,33 @@ class AccountingDataProcessor:
         
         return df
     
+    def _clean_numeric_series(self, series: pd.Series) -> Tuple[pd.Series, int]:
+        """Cleans a numeric column parsing each distinct text value only once.
+        Also returns how many values contained '(' (counted in the same pass)"""
+        if series.dtype.kind in 'biuf':
+            # Columna ya numérica (numpy): el limpiador solo haría float(value) en cada fila
+            return series.astype(np.float64), 0
+        
+        clean_value = self._clean_numeric_value_with_zero_fill
+        cleaned_texts: Dict[str, Tuple[Any, bool]] = {}
+        parentheses_count = 0
+        
+        def clean_cached(value):
+            nonlocal parentheses_count
+            if not isinstance(value, str):
+                if not isinstance(value, (int, float)) and '(' in str(value):
+                    parentheses_count += 1
+                return clean_value(value)
+            cached = cleaned_texts.get(value)
+            if cached is None:
+                cached = cleaned_texts[value] = (clean_value(value), '(' in value)
+            if cached[1]:
+                parentheses_count += 1
+            return cached[0]
+        
+        cleaned = series.apply(clean_cached)
+        return cleaned, parentheses_count
+    
     def _clean_numeric_value_with_zero_fill(self, value) -> float:
         try:
             # Si ya es numérico, devolverlo tal como está (sin abs)
@@ -331,12 +408,16 @@ class AccountingDataProcessor:
             str_value = str(value).strip()
             if str_value == '':
                 return 0.0
+            
+            # Caso más común (exportaciones tipo "1234.56"): la limpieza no cambiaría nada
+            if _PLAIN_NUMBER_RE.fullmatch(str_value):
+                return float(str_value)
            
             # Detectar si tiene paréntesis (indica negativo)
-            is_parentheses_negative = bool(re.search(r'\([^)]*\d+[^)]*\)', str_value))
+            is_parentheses_negative = '(' in str_value and _PARENTHESES_NUMBER_RE.search(str_value) is not None
            
             # Limpiar: mantener solo dígitos, puntos, comas y signos menos
-            cleaned = re.sub(r'[^\d.,\-]', '', str_value)
+            cleaned = _NON_NUMERIC_CHARS_RE.sub('', str_value)
            
             if cleaned:
                 # Manejar comas y puntos decimales
@@ -371,9 +452,8 @@ class AccountingDataProcessor:
                         # Si len(dot_parts) == 2 and len(last_part) <= 2: mantener como decimal normal
                
                 # Extraer el primer número (ahora debería ser el limpio)
-                first_num = re.search(r'-?\d+\.?\d*', cleaned)
-                if first_num:
-                    result = float(first_num.group())
+                result = _parse_first_number(cleaned)
+                if result is not None:
                     # Si había paréntesis, hacer negativo
                     if is_parentheses_negative:
                         result = -result
@@ -386,7 +466,8 @@ class AccountingDataProcessor:
 
 def clean_numeric_field(series: pd.Series, field_name: str = "field") -> pd.Series:
     processor = AccountingDataProcessor()
-    return series.apply(processor._clean_numeric_value_with_zero_fill)
+    cleaned, _ = processor._clean_numeric_series(series)
+    return cleaned
 
 def calculate_amount_from_debit_credit(debit_series: pd.Series, credit_series: pd.Series) -> pd.Series:
     return debit_series - credit_series
@@ -1,7 +1,13 @@
 # procesos_mapeo/balance_validator.py
+import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+try:
+    import numexpr  # opcional: evalúa la comparación del cruce en un único bucle sin temporales
+except ImportError:
+    numexpr = None
 
 logger = logging.getLogger(__name__)
 
@@ -66,17 +72,17 @@ class BalanceValidator:
             if 'journal_entry_id' not in df.columns:
                 return {'quality_score': 0.0, 'error': 'No journal_entry_id column found'}
             
-            # Handle different naming conventions
-            rename_map = {}
-            if 'amount_numeric' in df.columns and 'amount' not in df.columns:
-                rename_map['amount_numeric'] = 'amount'
-            if 'debit_amount_numeric' in df.columns and 'debit_amount' not in df.columns:
-                rename_map['debit_amount_numeric'] = 'debit_amount'
-            if 'credit_amount_numeric' in df.columns and 'credit_amount' not in df.columns:
-                rename_map['credit_amount_numeric'] = 'credit_amount'
+            # Handle different naming conventions: sólo se seleccionan las columnas
+            # que usa la evaluación, en vez de renombrar (y copiar) el DataFrame entero
+            source_columns = {'journal_entry_id': 'journal_entry_id'}
+            for field in ('amount', 'debit_amount', 'credit_amount'):
+                if field in df.columns:
+                    source_columns[field] = field
+                elif f'{field}_numeric' in df.columns:
+                    source_columns[field] = f'{field}_numeric'
             
-            if rename_map:
-                df = df.rename(columns=rename_map)
+            df = df[list(source_columns.values())]
+            df.columns = list(source_columns.keys())
 
             if 'debit_amount' in df.columns and 'credit_amount' in df.columns:
                 return self._evaluate_journal_id_with_debit_credit(df)
@@ -91,7 +97,7 @@ class BalanceValidator:
     def _evaluate_journal_id_with_debit_credit(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Complete evaluation using debit/credit + amount"""
         try:
-            entry_validation = self._validate_entry_level_balance(df)
+            entry_validation = self._validate_entry_level_balance(df, include_records=False)
             
             entries_count = entry_validation.get('entries_count', 0)
             balanced_entries_count = entry_validation.get('balanced_entries_count', 0)
@@ -188,19 +194,43 @@ class BalanceValidator:
             'is_balanced': is_balanced
         }
     
-    def _validate_entry_level_balance(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Validates balance for each accounting entry"""
-        grouped = df.groupby('journal_entry_id').agg({
-            'debit_amount': 'sum',
-            'credit_amount': 'sum'
-        }).reset_index()
+    def _validate_entry_level_balance(self, df: pd.DataFrame, include_records: bool = True) -> Dict[str, Any]:
+        """Validates balance for each accounting entry (per-entry records only if include_records)"""
+        entry_ids, debit_sums, credit_sums = self._sum_by_entry(df)
+        
+        if not include_records:
+            # Sólo conteos: evita construir el DataFrame agrupado y un dict por asiento
+            is_balanced = np.abs(debit_sums - credit_sums) < self.tolerance
+            entries_count = len(is_balanced)
+            balanced_count = is_balanced.sum()
+            
+            self.validation_stats['total_entries_checked'] = entries_count
+            self.validation_stats['balanced_entries'] = balanced_count
+            self.validation_stats['unbalanced_entries'] = int(entries_count - balanced_count)
+            
+            return {
+                'entries_count': entries_count,
+                'balanced_entries_count': balanced_count
+            }
+        
+        grouped = pd.DataFrame({
+            'journal_entry_id': entry_ids,
+            'debit_amount': debit_sums,
+            'credit_amount': credit_sums
+        })
         
         grouped['balance_difference'] = grouped['debit_amount'] - grouped['credit_amount']
         grouped['is_balanced'] = abs(grouped['balance_difference']) < self.tolerance
         
         entries_count = len(grouped)
         balanced_count = grouped['is_balanced'].sum()
-        unbalanced_entries = grouped[~grouped['is_balanced']]
+        
+        # Un único to_dict: los descuadrados se copian de los registros ya construidos
+        entry_records = grouped.to_dict('records')
+        unbalanced_entries = [
+            dict(record) for record, balanced in zip(entry_records, grouped['is_balanced'].to_numpy())
+            if not balanced
+        ]
         
         self.validation_stats['total_entries_checked'] = entries_count
         self.validation_stats['balanced_entries'] = balanced_count
@@ -209,12 +239,56 @@ class BalanceValidator:
         return {
             'entries_count': entries_count,
             'balanced_entries_count': balanced_count,
-            'unbalanced_entries': unbalanced_entries.to_dict('records'),
-            'entry_balance_check': grouped.to_dict('records')
+            'unbalanced_entries': unbalanced_entries,
+            'entry_balance_check': entry_records
         }
     
+    @staticmethod
+    def _sum_by_entry(df: pd.DataFrame) -> Tuple[Any, Any, Any]:
+        """Sums debit and credit per journal_entry_id (sorted ids, NaN ids dropped, as groupby)"""
+        entry_col = df['journal_entry_id']
+        debit_col = df['debit_amount']
+        credit_col = df['credit_amount']
+        
+        # factorize + bincount solo con importes float64/int64;
+        # el resto (texto, nullable...) conserva la semántica de groupby
+        fast_dtypes = (np.dtype(np.float64), np.dtype(np.int64))
+        if debit_col.dtype not in fast_dtypes or credit_col.dtype not in fast_dtypes:
+            grouped = df.groupby('journal_entry_id').agg({
+                'debit_amount': 'sum',
+                'credit_amount': 'sum'
+            })
+            return grouped.index, grouped['debit_amount'].to_numpy(), grouped['credit_amount'].to_numpy()
+        
+        if isinstance(entry_col.dtype, pd.CategoricalDtype):
+            # Los códigos de la categoría ya son la factorización (sin hashing). Como groupby
+            # (observed=False), salen todas las categorías en su orden, con 0 si no tienen filas
+            codes = entry_col.cat.codes.to_numpy()
+            uniques = pd.Categorical.from_codes(np.arange(len(entry_col.cat.categories)), dtype=entry_col.dtype)
+        else:
+            codes, uniques = pd.factorize(entry_col, sort=True)
+        valid = codes >= 0
+        if not valid.all():
+            codes = codes[valid]
+        
+        def _bincount_sum(col: pd.Series) -> np.ndarray:
+            values = col.to_numpy()
+            if not valid.all():
+                values = values[valid]
+            if values.dtype == np.int64:
+                return np.bincount(codes, weights=values, minlength=len(uniques)).astype(np.int64)
+            # groupby.sum ignora los NaN; sin filas bincount devuelve enteros
+            values = np.where(np.isnan(values), 0.0, values)
+            return np.bincount(codes, weights=values, minlength=len(uniques)).astype(np.float64, copy=False)
+        
+        return uniques, _bincount_sum(debit_col), _bincount_sum(credit_col)
+    
     def _validate_cross_balance(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Cross-validation using amount field"""
+        columns = (df['debit_amount'], df['credit_amount'], df['amount'])
+        if all(isinstance(col.dtype, np.dtype) and col.dtype.kind in 'if' for col in columns):
+            return self._validate_cross_balance_numeric(*(col.to_numpy() for col in columns))
+        
         calculated_amount = df['debit_amount'] - df['credit_amount']
         actual_amount = df['amount']
         
@@ -233,6 +307,46 @@ class BalanceValidator:
             'significant_differences': significant_diffs.head(10).tolist() if len(significant_diffs) > 0 else []
         }
     
+    def _validate_cross_balance_numeric(self, debit: np.ndarray, credit: np.ndarray,
+                                        amount: np.ndarray) -> Dict[str, Any]:
+        """Cross-validation over numeric arrays reusing a single difference buffer"""
+        if numexpr is not None and debit.dtype == credit.dtype == amount.dtype == np.float64:
+            # Sólo se materializan las diferencias de las filas que no cuadran
+            mismatches = ~numexpr.evaluate(
+                'abs(d - c - a) < tol',
+                local_dict={'d': debit, 'c': credit, 'a': amount, 'tol': float(self.tolerance)}
+            )
+            significant_diffs = np.abs(debit[mismatches] - credit[mismatches] - amount[mismatches])
+        else:
+            differences = debit - credit
+            if np.result_type(differences, amount) == differences.dtype:
+                np.subtract(differences, amount, out=differences)
+            else:
+                differences = differences - amount
+            np.abs(differences, out=differences)
+            
+            mismatches = ~(differences < self.tolerance)
+            significant_diffs = differences[mismatches]
+        
+        match_count = len(debit) - np.count_nonzero(mismatches)
+        
+        max_difference = 0.0
+        if len(significant_diffs) > 0:
+            # Como Series.max(): ignora los NaN salvo que no haya otro valor
+            comparable = significant_diffs
+            if comparable.dtype.kind == 'f':
+                comparable = comparable[~np.isnan(comparable)]
+            max_difference = comparable.max() if len(comparable) > 0 else np.float64(np.nan)
+        
+        return {
+            'total_rows': len(debit),
+            'matching_rows': np.int64(match_count),
+            'match_rate': np.int64(match_count)/len(debit),
+            'discrepancies': len(significant_diffs),
+            'max_difference': max_difference,
+            'significant_differences': significant_diffs[:10].tolist()
+        }
+    
     def generate_balance_summary_report(self, balance_report: Dict[str, Any]) -> str:
         """Generates textual summary of balance report"""
         lines = []